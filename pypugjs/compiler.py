@@ -1,10 +1,90 @@
+import ast
+import copy
+import operator
 import re
 import os
 import six
+from collections import deque
+
+from . import nodes
+from .runtime import attrs as _attrs, extract_classes, iteration
+
+missing = object()
+FOLDABLE_TYPES = six.string_types + six.integer_types + (
+    float,
+    bool,
+    type(None),
+    list,
+    tuple,
+    dict,
+)
+TEMPLATE_MARKERS = ('{{', '}}', '{%', '%}', '{#', '#}', '${', '<%', '%>', '\n', '\\')
+CONSTANT_NAMES = {'True': True, 'False': False, 'None': None}
+NUMBER_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+# nodes whose copies in an unrolled loop show every use of the loop variables
+UNROLLABLE_NODES = (
+    'Block',
+    'BlockComment',
+    'Comment',
+    'Conditional',
+    'Each',
+    'Literal',
+    'String',
+    'Tag',
+    'Text',
+)
+# nodes a mixin expanded at its call site may consist of
+INLINABLE_NODES = (
+    'Block',
+    'BlockComment',
+    'Comment',
+    'Conditional',
+    'Literal',
+    'String',
+    'Tag',
+    'Text',
+)
+# expressions binding names of their own
+SCOPING_EXPRESSIONS = (
+    ast.Lambda,
+    ast.ListComp,
+    ast.SetComp,
+    ast.DictComp,
+    ast.GeneratorExp,
+)
+# no power here, folding 9 ** 9 ** 9 would hang the compiler
+BINARY_OPERATORS = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+    ast.FloorDiv: operator.floordiv,
+    ast.Mod: operator.mod,
+}
+COMPARE_OPERATORS = {
+    ast.Eq: operator.eq,
+    ast.NotEq: operator.ne,
+    ast.Lt: operator.lt,
+    ast.LtE: operator.le,
+    ast.Gt: operator.gt,
+    ast.GtE: operator.ge,
+    ast.In: lambda a, b: a in b,
+    ast.NotIn: lambda a, b: a not in b,
+}
 
 
 class Compiler(object):
+    """Compiles a parsed template into the source of a template engine.
+
+    The options are read once, `compile` can be called again with another
+    tree and resets everything of the previous run. An instance compiles a
+    single template at a time, use one per thread.
+    """
+
     RE_INTERPOLATE = re.compile(r'(\\)?([#!]){(.*?)}')
+    RE_WHITESPACE = re.compile(r'\s+')
+    # interpolations and raw template syntax minify leaves as they are
+    RE_CODE_SPANS = re.compile(r'(\\?[#!]{.*?}|{{.*?}}|{%.*?%}|{#.*?#}|\${.*?}|<%.*?%>)')
     doctypes = {
         '5': '<!DOCTYPE html>',
         'xml': '<?xml version="1.0" encoding="utf-8" ?>',
@@ -46,6 +126,8 @@ class Compiler(object):
         'textarea',
     ]
     self_closing = ['meta', 'img', 'link', 'input', 'area', 'base', 'col', 'br', 'hr']
+    # whitespace inside these is kept as it is when minifying
+    preformatted_tags = ['pre', 'textarea', 'script', 'style']
     auto_close_code = [
         'if',
         'for',
@@ -63,90 +145,761 @@ class Compiler(object):
         'ra,',
     ]
     filters = {}
+    # drop the branches of conditionals whose sentence is known at compile time
+    # and inline constants bound by literal assignments
+    fold_conditionals = True
+    # constant values written into the text of the template as they are
+    inline_types = six.string_types + six.integer_types + (float,)
+    # names the engine reads as literals, those of python by default
+    constant_names = CONSTANT_NAMES
+    # loop variable of the engine -> attributes always holding numbers
+    loop_counters = {}
+    # each over a literal sequence of at most that many items is unrolled
+    unroll_limit = 8
+    # leave out the definitions of mixins the template never calls
+    prune_mixins = True
+    # mixins of at most that many nodes are expanded at their call sites by
+    # the compilers supporting it, 0 turns it off
+    inline_mixins = 0
+    # include compiles the included template into this one
+    inlines_includes = False
+    # (compiler class, node class) -> (visit function, ends running string)
+    _dispatch = {}
+    # tag configuration -> tag name -> (inline, self closing, preformatted,
+    # opening fragment, closing fragment)
+    _tag_tables = {}
 
-    def __init__(self, node, **options):
+    def __init__(self, node=None, **options):
         self.options = options
         self.node = node
-        self.hasCompiledDoctype = False
-        self.hasCompiledTag = False
-        self.pp = options.get('pretty', True)
+        self.minify = options.get('minify', False)
+        self.pp = options.get('pretty', True) and not self.minify
         self.debug = options.get('compileDebug', False) is not False
-        self.filters.update(options.get('filters', {}))
-        self.doctypes.update(options.get('doctypes', {}))
+        # options extend copies, the class attributes stay the same for every
+        # compiler working on the same tree
+        if 'filters' in options:
+            self.filters = dict(self.filters)
+            self.filters.update(options['filters'])
+        if 'doctypes' in options:
+            self.doctypes = dict(self.doctypes)
+            self.doctypes.update(options['doctypes'])
         # self.var_processor = options.get('var_processor', lambda x: x)
-        self.self_closing.extend(options.get('self_closing', []))
-        self.auto_close_code.extend(options.get('auto_close_code', []))
-        self.inline_tags.extend(options.get('inline_tags', []))
+        for name in ('self_closing', 'auto_close_code', 'inline_tags'):
+            if name in options:
+                setattr(self, name, getattr(self, name) + list(options[name]))
         self.useRuntime = options.get('useRuntime', True)
+        self.unroll_limit = options.get('unroll_limit', self.unroll_limit)
+        self.prune_mixins = options.get('prune_mixins', self.prune_mixins)
+        self.inline_mixins = options.get('inline_mixins', self.inline_mixins)
+        self.translations = options.get('translations', None)
         self.extension = options.get('extension', None) or '.pug'
-        self.indents = 0
         self.doctype = None
         self.terse = False
         self.xml = False
-        self.mixing = 0
+        self._tags = self._tag_table()
         self.variable_start_string = options.get("variable_start_string", "{{")
         self.variable_end_string = options.get("variable_end_string", "}}")
         if 'doctype' in self.options:
             self.setDoctype(options['doctype'])
+        # a doctype in the template only lasts for its compilation
+        self._default_doctype = (self.doctype, self.terse, self.xml, self._tags)
+        self.reset()
+
+    def reset(self):
+        """Forget the state of the last compilation, keeping the options."""
+        self.doctype, self.terse, self.xml, self._tags = self._default_doctype
+        self.hasCompiledDoctype = False
+        self.hasCompiledTag = False
+        self.indents = 0
+        self.mixing = 0
         self.instring = False
+        self.preformatted = 0
 
     def var_processor(self, var):
         if isinstance(var, six.string_types) and var.startswith('_ '):
             var = '_("%s")' % var[2:]
         return var
 
+    def translate(self, message):
+        """Look up the `_ message` of a template in the `translations` option."""
+        gettext = getattr(self.translations, 'ugettext' if six.PY2 else 'gettext')
+        return gettext(message)
+
     def compile_top(self):
         return ''
 
-    def compile(self):
-        self.buf = [self.compile_top()]
-        self.lastBufferedIdx = -1
-        self.visit(self.node)
+    def compile(self, node=None):
+        self._compile(node)
         compiled = u''.join(self.buf)
         if isinstance(compiled, six.binary_type):
             compiled = six.text_type(compiled, 'utf8')
         return compiled
 
+    def compile_iter(self, node=None, chunk_size=1024):
+        """Yield the compiled source in chunks of `chunk_size` fragments.
+
+        The passes dropping unused mixins and constants blank fragments
+        buffered long before, so the chunks follow once the tree is
+        visited. Joined they are what `compile` returns.
+        """
+        self._compile(node)
+        buf = self.buf
+        for start in range(0, len(buf), chunk_size):
+            yield u''.join(buf[start : start + chunk_size])
+
+    def _compile(self, node):
+        if node is not None:
+            self.node = node
+        self.reset()
+        self.buf = [self.compile_top()]
+        self._static_nodes = {}
+        self._folded_tags = {}
+        self._folded_conditionals = {}
+        self._constants = {}
+        self._bound_names = set()
+        self.constants = {}
+        self.unrolled = {}
+        self.loops = 0
+        self._mixin_definitions = []
+        self._mixins = {}
+        self._mixin_parameters = {}
+        self._template_words = None
+        self.tree = self.resolve_tree(self.node)
+        if self.fold_conditionals:
+            self.collect_constants(self.tree)
+        self.compile_shared()
+        self.visit(self.tree)
+        self.drop_unused_mixins()
+        self.finish_buffer()
+
+    def compile_shared(self):
+        """Buffer what several parts of the template share, ahead of them."""
+
+    def resolve_tree(self, node):
+        """Return the tree compiled for the template node, node itself here.
+
+        Compilers rendering inheritance themselves resolve it with `inherit`.
+        """
+        return node
+
+    def inherit(self, node, load):
+        """Return the tree of node with the templates it extends resolved.
+
+        `load(path)` returns the parsed template an extends names. Named
+        blocks replace, append or prepend to the blocks of the same name in
+        the templates they extend. Mixins and code at the top level of the
+        extending templates run first, those of the most derived one last.
+        The parsed templates stay as they are, blocks are resolved in copies.
+        """
+        heads, overrides = [], {}
+        # templates count from 0, the most derived one, to the one extended last
+        level = 0
+        while True:
+            extends = [child for child in node.nodes if isinstance(child, nodes.Extends)]
+            if not extends:
+                break
+            head = []
+            for child in node.nodes:
+                if isinstance(child, nodes.CodeBlock):
+                    overrides.setdefault(child.name, []).append((level, child))
+                elif isinstance(child, (nodes.Code, nodes.Assignment)) or (
+                    isinstance(child, nodes.Mixin) and not child.call
+                ):
+                    head.append(child)
+            heads.insert(0, head)
+            node = load(extends[0].path)
+            level += 1
+        if not heads:
+            return node
+        tree = nodes.Block()
+        for head in heads:
+            tree.nodes.extend(head)
+        tree.nodes.extend(self._inherited(node, overrides, level).nodes)
+        return tree
+
+    def _inherited(self, node, overrides, level):
+        """Return a copy of node of template `level` with its blocks resolved."""
+        if isinstance(node, nodes.CodeBlock) and node.name in overrides:
+            before, after = [], []
+            content = None
+            # overrides of more derived templates only, the most derived first
+            for override_level, override in overrides[node.name]:
+                if override_level >= level:
+                    continue
+                resolved = self._inherited_nodes(override, overrides, override_level)
+                if override.mode == 'append':
+                    after[:0] = resolved
+                elif override.mode == 'prepend':
+                    before.extend(resolved)
+                else:
+                    content = resolved
+                    break
+            if content is None:
+                content = self._inherited_nodes(node, overrides, level)
+            block = copy.copy(node)
+            block.nodes = deque(before + content + after)
+            return block
+        if isinstance(node, nodes.Block):
+            block = copy.copy(node)
+            block.nodes = deque(self._inherited_nodes(node, overrides, level))
+            return block
+        children = [
+            attr
+            for attr in ('code', 'block')
+            if isinstance(getattr(node, attr, None), nodes.Node)
+        ]
+        if not children and not getattr(node, 'next', None):
+            return node
+        node = copy.copy(node)
+        for attr in children:
+            setattr(node, attr, self._inherited(getattr(node, attr), overrides, level))
+        if getattr(node, 'next', None):
+            node.next = [self._inherited(next, overrides, level) for next in node.next]
+        return node
+
+    def _inherited_nodes(self, block, overrides, level):
+        return [self._inherited(child, overrides, level) for child in block.nodes]
+
+    def only_block(self, node, name):
+        """Return the tree of node rendering nothing but the blocks `name`.
+
+        Code, assignments, mixin definitions and includes stay for the
+        blocks to depend on, as do the conditionals and loops around them.
+        Any other markup is left out.
+        """
+        tree = nodes.Block()
+        tree.nodes.extend(self._block_nodes(node, name))
+        return tree
+
+    def _block_nodes(self, node, name):
+        if isinstance(node, nodes.CodeBlock) and node.name == name:
+            return [node]
+        if isinstance(node, (nodes.Assignment, nodes.Include, nodes.Mixin)):
+            return [node] if not getattr(node, 'call', False) else []
+        if isinstance(node, (nodes.Code, nodes.Each, nodes.Conditional)):
+            if isinstance(node, nodes.Code) and node.buffer:
+                return self._block_nodes(node.block, name) if node.block else []
+            kept = copy.copy(node)
+            if node.block is not None:
+                kept.block = self.only_block(node.block, name)
+            if isinstance(node, nodes.Conditional):
+                kept.next = [self._block_nodes(next, name)[0] for next in node.next]
+                return [kept]
+            if isinstance(node, nodes.Code) or kept.block.nodes:
+                return [kept]
+            return []
+        if isinstance(node, nodes.Block):
+            children = node.nodes
+        else:
+            children = [getattr(node, 'block', None)]
+        kept = []
+        for child in children:
+            if isinstance(child, nodes.Node):
+                kept.extend(self._block_nodes(child, name))
+        return kept
+
+    def finish_buffer(self):
+        """Rework the fragments once unused parts of the template are blanked."""
+
     def setDoctype(self, name):
         self.doctype = self.doctypes.get(name or 'default', '<!DOCTYPE %s>' % name)
         self.terse = name in ['5', 'html']
         self.xml = self.doctype.startswith('<?xml')
+        self._tags = self._tag_table()
+
+    def _tag_table(self):
+        """Return the tag classifications shared by compilers set up like this."""
+        key = (
+            tuple(self.inline_tags),
+            tuple(self.self_closing),
+            tuple(self.preformatted_tags),
+            self.xml,
+        )
+        return Compiler._tag_tables.setdefault(key, {})
+
+    def classify_tag(self, name):
+        """Return (inline, self closing, preformatted, open, close) of a tag."""
+        entry = self._tags.get(name)
+        if entry is None:
+            closed = name in self.self_closing and not self.xml
+            entry = self._tags[name] = (
+                name in self.inline_tags,
+                closed,
+                name in self.preformatted_tags and not closed,
+                '<' + name,
+                '</%s>' % name,
+            )
+        return entry
+
+    @property
+    def terse_attributes(self):
+        """Whether attributes with the value of their name collapse to the name."""
+        return self.terse or (self.minify and not self.xml)
+
+    def minify_text(self, text):
+        if self.minify and not self.preformatted:
+            parts = self.RE_CODE_SPANS.split(text)
+            parts[::2] = [self.RE_WHITESPACE.sub(' ', part) for part in parts[::2]]
+            text = ''.join(parts)
+            if text.startswith(' ') and self.buf[-1].endswith(' '):
+                text = text[1:]
+        return text
 
     def buffer(self, str):
-        if self.lastBufferedIdx == len(self.buf):
-            self.lastBuffered += str
-            self.buf[self.lastBufferedIdx - 1] = self.lastBuffered
-        else:
-            self.buf.append(str)
-            self.lastBuffered = str
-            self.lastBufferedIdx = len(self.buf)
+        # fragments are only collected here and joined once in compile(),
+        # merging them on the fly would copy ever growing strings
+        self.buf.append(str)
 
     def visit(self, node, *args, **kwargs):
-        # debug = self.debug
-        # if debug:
-        #     self.buf.append('__pugjs.unshift({ lineno: %d, filename: %s });' % (
-        #         node.line, ('"%s"' % node.filename) if node.filename else '__pugjs[0].filename'))
-        #
-        # if node.debug==False and self.debug:
-        #     self.buf.pop()
-        #     self.buf.pop()
-
-        self.visitNode(node, *args, **kwargs)
-        # if debug: self.buf.append('__pugjs.shift();')
-
-    def visitNode(self, node, *args, **kwargs):
-        name = node.__class__.__name__
-        if self.instring and name != 'Tag':
+        node_class = node.__class__
+        try:
+            method, breaks_string = self._dispatch[self.__class__, node_class]
+        except KeyError:
+            method, breaks_string = self._resolve_visitor(node_class)
+        if breaks_string and self.instring:
+            self.break_string()
+        return method(self, node, *args, **kwargs)
+
+    visitNode = visit
+
+    def break_string(self):
+        if not self.minify or self.preformatted:
             self.buffer('\n')
-            self.instring = False
-        return getattr(self, 'visit%s' % name)(node, *args, **kwargs)
+        elif not self.buf[-1].endswith(' '):
+            self.buffer(' ')
+        self.instring = False
+
+    @classmethod
+    def _resolve_visitor(cls, node_class):
+        """Look up the visit method for node_class once per compiler class.
+
+        Plain functions are stored so subclasses get their own entries while
+        sharing the table, and a running string is ended by everything but tags.
+        """
+        method = getattr(cls, 'visit%s' % node_class.__name__)
+        entry = (method, node_class.__name__ != 'Tag')
+        cls._dispatch[cls, node_class] = entry
+        return entry
 
     def visitLiteral(self, node):
         self.buffer(node.str)
 
     def visitBlock(self, block):
         for node in block.nodes:
+            self.constants = self._constants.get(node, {})
+            if self.unrolled:
+                self.constants = dict(self.constants)
+                self.constants.update(self.unrolled)
+            if node.__class__ is nodes.Conditional and self.fold_conditionals:
+                node = self.fold_conditional(node)
+                if node is None:
+                    continue
+            if node.__class__ is nodes.Each and self.unroll_each(node):
+                continue
+            if node.__class__ is nodes.Code and self.inline_code(node):
+                continue
+            loops = self.loops
+            self.loops = self._loops_within(node)
+            start = len(self.buf)
+            if node.__class__ is nodes.Mixin and not node.call:
+                # a mixin defined twice can't be told apart at compile time
+                self._mixins[node.name] = (
+                    None if node.name in self._mixins else node
+                )
             self.visit(node)
+            self.loops = loops
+            if node.__class__ is nodes.Mixin and not node.call:
+                self._mixin_definitions.append((node.name, start, len(self.buf)))
+
+    def unroll_each(self, each):
+        """Visit the body of each once per item if it loops over a literal.
+
+        Every copy of the body gets the loop variables as constants. Gives up,
+        leaving the loop to the engine, if the sequence isn't known, has more
+        than `unroll_limit` items or a copy still refers to the loop.
+        """
+        if not self.fold_conditionals or not self.unroll_limit:
+            return False
+        items = self._loop_items(each)
+        if items is missing or not self._unrollable(each.block):
+            return False
+
+        if self.instring:
+            self.break_string()
+        state = (self.instring, self.hasCompiledTag, self.hasCompiledDoctype)
+        unrolled = self.unrolled
+        start = len(self.buf)
+        for item in items:
+            self.unrolled = dict(unrolled)
+            self.unrolled.update(zip(each.keys, item))
+            self.visit(each.block)
+        self.unrolled = unrolled
+
+        # the loop objects of jinja, mako and django go away as well
+        names = set(each.keys) | {'loop', 'forloop'}
+        if names.intersection(re.findall(r'\w+', u''.join(self.buf[start:]))):
+            del self.buf[start:]
+            self.instring, self.hasCompiledTag, self.hasCompiledDoctype = state
+            return False
+        return True
+
+    def _loop_items(self, each):
+        """Return the values each binds its keys to, or `missing`."""
+        value = self.constant_value(each.obj, self.constants)
+        if value is missing:
+            value = self._range_value(each.obj)
+        if not isinstance(value, (list, tuple, dict)) or len(value) > self.unroll_limit:
+            return missing
+        items = []
+        for item in iteration(value, len(each.keys)):
+            item = (item,) if len(each.keys) == 1 else tuple(item)
+            if len(item) != len(each.keys):
+                return missing
+            items.append(item)
+        return items
+
+    def _range_value(self, expression):
+        try:
+            node = ast.parse(expression.strip(), mode='eval').body
+        except (SyntaxError, ValueError, MemoryError, RecursionError):
+            return missing
+        if (
+            not isinstance(node, ast.Call)
+            or not isinstance(node.func, ast.Name)
+            or node.func.id != 'range'
+            or 'range' in self._bound_names
+            or node.keywords
+            or not 1 <= len(node.args) <= 3
+        ):
+            return missing
+        args = [self._evaluate(arg, self.constants) for arg in node.args]
+        if not all(type(arg) in six.integer_types for arg in args):
+            return missing
+        try:
+            value = range(*args)
+        except ValueError:
+            return missing
+        return list(value) if len(value) <= self.unroll_limit else missing
+
+    def _unrollable(self, block):
+        """Tell if a copy of block could only miss the loop in its output.
+
+        Assignments, code and mixin or block bodies might bind or read the
+        loop variables where the compiled output doesn't show it.
+        """
+        for node in self._walk(block):
+            name = node.__class__.__name__
+            if name == 'Code':
+                if not node.buffer or node.block:
+                    return False
+            elif name == 'Mixin':
+                if not node.call or node.block:
+                    return False
+            elif name not in UNROLLABLE_NODES:
+                return False
+        return True
+
+    def _loops_within(self, node):
+        """Count the loops of the engine around the content of node."""
+        name = node.__class__.__name__
+        if name in ('Mixin', 'CodeBlock'):
+            return 0
+        if name == 'Each' or (
+            name == 'Code' and node.block and node.val.split()[:1] == ['for']
+        ):
+            return self.loops + 1
+        return self.loops
+
+    def drop_unused_mixins(self):
+        """Blank the definitions of mixins no call can reach.
+
+        Calls outside of any definition are followed through the definitions
+        they reach. Templates defining nothing but mixins and templates whose
+        mixins other templates might call (extends, blocks, runtime includes)
+        keep all of them.
+        """
+        if (
+            not self.prune_mixins
+            or not self._mixin_definitions
+            or self._exports_mixins(self.tree)
+        ):
+            return
+        # the imports of compile_top don't make a template more than a library
+        skipped = {0}
+        for _, start, end in self._mixin_definitions:
+            skipped.update(range(start, end))
+        rest = u''.join(
+            fragment for i, fragment in enumerate(self.buf) if i not in skipped
+        )
+        if not rest.strip():
+            return
+        names = set(name for name, _, _ in self._mixin_definitions)
+        reached = names.intersection(re.findall(r'\w+', rest))
+        pending = list(reached)
+        while pending:
+            name = pending.pop()
+            for defined, start, end in self._mixin_definitions:
+                if defined == name:
+                    body = u''.join(self.buf[start:end])
+                    called = names.intersection(re.findall(r'\w+', body))
+                    pending.extend(called - reached)
+                    reached.update(called)
+        for name, start, end in self._mixin_definitions:
+            if name not in reached:
+                self.buf[start:end] = [''] * (end - start)
+
+    def mixin_bindings(self, call):
+        """Return the (parameter, argument) pairs to expand call in place.
+
+        Only calls without a block to mixins of at most `inline_mixins` nodes
+        whose body refers to nothing but their parameters qualify, that body
+        then reads the same anywhere. None if the engine has to do the call.
+        """
+        mixin = self._mixins.get(call.name)
+        if not self.inline_mixins or mixin is None or call.block:
+            return None
+        parameters = self._mixin_parameters.get(mixin, missing)
+        if parameters is missing:
+            parameters = self._inlinable_parameters(mixin)
+            self._mixin_parameters[mixin] = parameters
+        if parameters is None:
+            return None
+
+        source = 'f(%s)' % (call.args or '')
+        try:
+            node = ast.parse(source, mode='eval').body
+        except (SyntaxError, ValueError, MemoryError, RecursionError):
+            return None
+        if (
+            len(node.args) > len(parameters)
+            or any(isinstance(arg, ast.Starred) for arg in node.args)
+            or any(keyword.arg is None for keyword in node.keywords)
+        ):
+            return None
+        values = {}
+        for (name, _), arg in zip(parameters, node.args):
+            values[name] = ast.get_source_segment(source, arg)
+        for keyword in node.keywords:
+            if keyword.arg in values or keyword.arg not in dict(parameters):
+                return None
+            values[keyword.arg] = ast.get_source_segment(source, keyword.value)
+
+        bindings = []
+        for name, default in parameters:
+            value = values.get(name, default)
+            if value is missing:
+                return None
+            bindings.append((name, value))
+        return bindings
+
+    def expand_mixin(self, call):
+        """Visit the body of the mixin call refers to at the call site."""
+        # loop variables unrolled around the call mean nothing to the body
+        unrolled = self.unrolled
+        self.unrolled = {}
+        self.visitBlock(self._mixins[call.name].block)
+        self.unrolled = unrolled
+
+    def template_words(self):
+        """Return the words of the template outside of mixin definitions."""
+        if self._template_words is None:
+            words = set()
+            stack = [self.tree]
+            while stack:
+                item = stack.pop()
+                if isinstance(item, six.string_types):
+                    words.update(re.findall(r'\w+', item))
+                elif isinstance(item, dict):
+                    stack.extend(item.values())
+                elif isinstance(item, (list, tuple, deque)):
+                    stack.extend(item)
+                elif isinstance(item, nodes.Node):
+                    if not (isinstance(item, nodes.Mixin) and not item.call):
+                        stack.extend(vars(item).values())
+            self._template_words = words
+        return self._template_words
+
+    def _inlinable_parameters(self, mixin):
+        """Return the (name, default) parameters of a mixin fit for inlining.
+
+        Defaults are literal sources or `missing`. None if the mixin is too
+        big, does more than render markup or refers to names it doesn't get.
+        """
+        source = 'def f(%s): pass' % (mixin.args or '')
+        try:
+            arguments = ast.parse(source).body[0].args
+        except (SyntaxError, ValueError, MemoryError, RecursionError):
+            return None
+        if (
+            arguments.vararg
+            or arguments.kwarg
+            or arguments.kwonlyargs
+            or getattr(arguments, 'posonlyargs', None)
+        ):
+            return None
+        defaults = [missing] * (len(arguments.args) - len(arguments.defaults))
+        for default in arguments.defaults:
+            try:
+                ast.literal_eval(default)
+            except ValueError:
+                return None
+            defaults.append(ast.get_source_segment(source, default))
+        parameters = [(arg.arg, default) for arg, default in zip(arguments.args, defaults)]
+
+        known = set(name for name, _ in parameters)
+        expressions = []
+        count = 0
+        for node in self._walk(mixin.block):
+            count += 1
+            if count > self.inline_mixins + 1:
+                return None
+            name = node.__class__.__name__
+            if name == 'Mixin':
+                if not node.call or node.block:
+                    return None
+            elif name != 'Code' and name not in INLINABLE_NODES:
+                return None
+            if not self._collect_expressions(node, expressions):
+                return None
+
+        names = self._expression_names(expressions)
+        if names is None or not names.issubset(known):
+            return None
+        return parameters
+
+    def _collect_expressions(self, node, expressions):
+        """Add the expressions node evaluates at runtime to expressions.
+
+        Mixin calls add their arguments only. False if node does something
+        that can't be looked into: statements, raw template syntax or tags
+        with interpolated names.
+        """
+        name = node.__class__.__name__
+        if name == 'Code':
+            if not node.buffer or node.block or node.val.strip().startswith('_ '):
+                return False
+            expressions.append(node.val)
+        elif name == 'Mixin':
+            expressions.append('__pypugjs_mixin(%s)' % (node.args or ''))
+        elif name == 'Conditional':
+            if node.type not in ('if', 'elif', 'else', 'unless'):
+                return False
+            if node.type != 'else':
+                expressions.append(node.sentence)
+        elif name == 'Each':
+            expressions.append(node.obj)
+        elif name == 'Tag':
+            if node.buffer:
+                return False
+            for attr in node.attrs:
+                if not isinstance(attr['val'], six.string_types):
+                    continue
+                if not attr['static']:
+                    expressions.append(attr['val'])
+                elif not self._collect_interpolations(attr['val'], expressions):
+                    return False
+            if node.text:
+                return self._collect_interpolations(
+                    ''.join(node.text.nodes), expressions
+                )
+        elif name in ('Text', 'String'):
+            return self._collect_interpolations(''.join(node.nodes), expressions)
+        return True
+
+    def _collect_interpolations(self, text, expressions):
+        """Add the interpolated expressions of text, False on raw syntax."""
+        markers = ('{{', '{%', '${', '<%', self.variable_start_string)
+        if any(marker in text for marker in markers):
+            return False
+        for matchobj in self.RE_INTERPOLATE.finditer(text):
+            if not matchobj.group(1):
+                expressions.append(matchobj.group(3))
+        return True
+
+    def _expression_names(self, expressions):
+        """Return the names expressions read, None if they bind any or fail.
+
+        Names of literals the engine knows and called mixins are left out.
+        """
+        names = set()
+        for expression in expressions:
+            try:
+                tree = ast.parse(expression.strip(), mode='eval')
+            except (SyntaxError, ValueError, MemoryError, RecursionError):
+                return None
+            for node in ast.walk(tree):
+                if isinstance(node, SCOPING_EXPRESSIONS):
+                    return None
+                if isinstance(node, ast.Name):
+                    names.add(node.id)
+        names.discard('__pypugjs_mixin')
+        return names.difference(self.constant_names)
+
+    def _exports_mixins(self, node):
+        """Tell if other templates might call the mixins of the tree."""
+        for child in self._children(node):
+            name = child.__class__.__name__
+            if name in ('Extends', 'CodeBlock') or (
+                name == 'Include' and not self.inlines_includes
+            ):
+                return True
+            if name == 'Mixin' and not child.call:
+                continue
+            if self._exports_mixins(child):
+                return True
+        return False
+
+    def constant_text(self, expression, escape):
+        """Render expression right away if it only depends on constants.
+
+        A `_ message` counts as constant if `translations` are given. Values
+        are escaped like quoted literals in `interpolate`. Returns None for
+        anything else or anything that would read as template syntax.
+        """
+        expression = expression.strip()
+        if expression.startswith('_ ') and self.translations is not None:
+            value = self.translate(expression[2:])
+        else:
+            value = self.constant_value(expression, self.constants)
+        if not isinstance(value, self.inline_types) or isinstance(value, bool):
+            return None
+        text = six.text_type(value)
+        if escape:
+            text = self.html_escape(text)
+        if (
+            not self._template_safe(text)
+            or self.RE_INTERPOLATE.search(text)
+            or text.lstrip().startswith(('%', '##'))
+        ):
+            return None
+        return text
+
+    def inline_constants(self, text):
+        """Put the value of constant expressions interpolated in text into it."""
+        if not self.constants and self.translations is None:
+            return text
+
+        def repl(matchobj):
+            if matchobj.group(1):
+                return matchobj.group(0)
+            value = self.constant_text(matchobj.group(3), matchobj.group(2) == '#')
+            return matchobj.group(0) if value is None else value
+
+        return self.RE_INTERPOLATE.sub(repl, text)
+
+    def inline_code(self, code):
+        """Buffer the value of `= expression` if it only depends on constants."""
+        if not code.buffer or code.block:
+            return False
+        if not self.constants and self.translations is None:
+            return False
+        value = self.constant_text(code.val, code.escape)
+        if value is None:
+            return False
+        if self.instring:
+            self.break_string()
+        self.buffer(value)
+        return True
 
     def visitCodeBlock(self, block):
         self.buffer('{%% block %s %%}' % block.name)
@@ -185,7 +938,54 @@ class Compiler(object):
                 )
             )
 
+    def is_static(self, node):
+        """Tell if node renders the same output on every visit.
+
+        That is a tag tree made of literal attributes, text without
+        interpolation and comments only. Results are memoized per compile.
+        """
+        try:
+            return self._static_nodes[node]
+        except KeyError:
+            pass
+        name = node.__class__.__name__
+        if name == 'Tag':
+            static = (
+                not node.buffer
+                and not node.code
+                and all(attr['static'] for attr in node.attrs)
+                and (not node.text or self.is_static(node.text))
+                and self.is_static(node.block)
+            )
+        elif name == 'Block':
+            static = all(self.is_static(child) for child in node.nodes)
+        elif name in ('Text', 'String'):
+            static = not any(self.RE_INTERPOLATE.search(t) for t in node.nodes)
+        elif name == 'BlockComment':
+            static = self.is_static(node.block)
+        else:
+            static = name in ('Comment', 'Literal')
+        self._static_nodes[node] = static
+        return static
+
     def visitTag(self, tag):
+        if not self.hasCompiledTag or not self.is_static(tag):
+            return self._visitTag(tag)
+
+        # static trees are rendered once and reused as a single fragment
+        # whenever they show up again at the same indentation (loops, mixins)
+        key = (tag, self.indents, self.instring, self.preformatted)
+        folded = self._folded_tags.get(key)
+        if folded is None:
+            start = len(self.buf)
+            self._visitTag(tag)
+            folded = (u''.join(self.buf[start:]), self.instring)
+            del self.buf[start:]
+            self._folded_tags[key] = folded
+        self.buffer(folded[0])
+        self.instring = folded[1]
+
+    def _visitTag(self, tag):
         self.indents += 1
         name = tag.name
         if not self.hasCompiledTag:
@@ -193,12 +993,14 @@ class Compiler(object):
                 self.visitDoctype()
             self.hasCompiledTag = True
 
-        if self.pp and name not in self.inline_tags and not tag.inline:
+        inline, closed, preformatted, opening, closing = self.classify_tag(name)
+        if self.pp and not inline and not tag.inline:
             self.buffer('\n' + '  ' * (self.indents - 1))
-        if name in self.inline_tags or tag.inline:
+        if inline or tag.inline:
             self.instring = False
 
-        closed = name in self.self_closing and not self.xml
+        if preformatted:
+            self.preformatted += 1
         if tag.text:
             t = tag.text.nodes[0]
             if t.startswith(u'/'):
@@ -211,31 +1013,34 @@ class Compiler(object):
         if tag.buffer:
             self.buffer('<' + self.interpolate(name))
         else:
-            self.buffer('<%s' % name)
+            self.buffer(opening)
         self.visitAttributes(tag.attrs)
         self.buffer('/>' if not self.terse and closed else '>')
 
         if not closed:
-            if tag.code:
+            if tag.code and not self.inline_code(tag.code):
                 self.visitCode(tag.code)
             if tag.text:
                 text_val = tag.text.nodes[0]
                 if text_val.startswith(' '):
                     text_val = text_val[1:]
+                text_val = self.inline_constants(self.minify_text(text_val))
                 self.buffer(self.interpolate(text_val))
             self.escape = 'pre' == tag.name
             # empirically check if we only contain text
             textOnly = tag.textOnly or not bool(len(tag.block.nodes))
             self.instring = False
             self.visit(tag.block)
+            if preformatted:
+                self.preformatted -= 1
 
-            if self.pp and name not in self.inline_tags and not textOnly:
+            if self.pp and not inline and not textOnly:
                 self.buffer('\n' + '  ' * (self.indents - 1))
 
             if tag.buffer:
                 self.buffer('</' + self.interpolate(name) + '>')
             else:
-                self.buffer('</%s>' % name)
+                self.buffer(closing)
         self.indents -= 1
 
     def visitFilter(self, filter):
@@ -247,13 +1052,13 @@ class Compiler(object):
 
         fn = self.filters.get(filter.name)
         if filter.isASTFilter:
-            self.buf.append(fn(filter.block, self, filter.attrs))
+            self.buffer(fn(filter.block, self, filter.attrs))
         else:
             text = ''.join(filter.block.nodes)
             text = self.interpolate(text)
-            filter.attrs = filter.attrs or {}
-            filter.attrs['filename'] = self.options.get('filename', None)
-            self.buffer(fn(text, filter.attrs))
+            attrs = dict(filter.attrs or {})
+            attrs['filename'] = self.options.get('filename', None)
+            self.buffer(fn(text, attrs))
 
     def html_escape(self, s):
         return (s
@@ -285,6 +1090,8 @@ class Compiler(object):
                 # Django doesn't correctly escape strings. To stay consistent
                 # with Pug, escape these now.
                 return self.html_escape(matchvar[1:-1])
+            if self.safe_expression(matchvar):
+                filter_string = ''
 
             return (
                 self.variable_start_string
@@ -296,21 +1103,22 @@ class Compiler(object):
         return self.RE_INTERPOLATE.sub(repl, text)
 
     def visitText(self, text):
-        text = ''.join(text.nodes)
-        text = self.interpolate(text)
+        text = self.minify_text(''.join(text.nodes))
+        text = self.interpolate(self.inline_constants(text))
         self.buffer(text)
         if self.pp:
             self.buffer('\n')
 
     def visitString(self, text):
         instring = not text.inline
-        text = ''.join(text.nodes)
-        text = self.interpolate(text)
-        self.buffer(text)
+        text = self.minify_text(''.join(text.nodes))
+        text = self.interpolate(self.inline_constants(text))
+        if text or not self.minify:
+            self.buffer(text)
         self.instring = instring
 
     def visitComment(self, comment):
-        if not comment.buffer:
+        if not comment.buffer or self.minify:
             return
         if self.pp:
             self.buffer('\n' + '  ' * (self.indents))
@@ -337,6 +1145,8 @@ class Compiler(object):
         if not comment.buffer:
             return
         isConditional = comment.val.strip().startswith('if')
+        if self.minify and not isConditional:
+            return
         self.buffer(
             '<!--[%s]>' % comment.val.strip()
             if isConditional
@@ -345,6 +1155,246 @@ class Compiler(object):
         self.visit(comment.block)
         self.buffer('<![endif]-->' if isConditional else '-->')
 
+    def collect_constants(self, block):
+        """Record the constants every node of the tree can rely on.
+
+        A constant is a name bound exactly once in the template, by a literal
+        assignment that runs unconditionally before the node. Names touched
+        by code or loops don't count, and templates sharing their scope
+        through extends or include only get literals.
+        """
+        bindings = {}
+        shared_scope = False
+        for node in self._walk(block):
+            name = node.__class__.__name__
+            if name in ('Extends', 'Include'):
+                shared_scope = True
+            elif name == 'Assignment':
+                bindings[node.name] = bindings.get(node.name, 0) + 1
+            elif name == 'Each':
+                for key in node.keys:
+                    bindings[key] = 2
+            elif name == 'Code' and not node.buffer:
+                for word in re.findall(r'\w+', node.val):
+                    bindings[word] = 2
+        self._bound_names = set(bindings)
+        names = set(name for name, count in bindings.items() if count == 1)
+        if names and not shared_scope:
+            self._bind_constants(block, names, {}, False)
+
+    def _bind_constants(self, node, names, constants, scoped):
+        """Record constants for node and its children, return those after it."""
+        name = node.__class__.__name__
+        if name == 'Assignment':
+            if not scoped and node.name in names:
+                value = self.constant_value(node.val, constants)
+                if value is not missing:
+                    constants = dict(constants)
+                    constants[node.name] = value
+            return constants
+        # nodes share the mapping until an assignment makes a new one
+        self._constants[node] = constants
+        inner = constants
+        if name in ('Mixin', 'CodeBlock'):
+            # bodies run in a scope of their own, later or elsewhere
+            inner, scoped = {}, True
+        elif name not in ('Block', 'Tag'):
+            scoped = True
+        for child in self._children(node):
+            inner = self._bind_constants(child, names, inner, scoped)
+        return constants if scoped else inner
+
+    def _children(self, node):
+        if isinstance(node, nodes.Block):
+            return list(node.nodes)
+        children = [
+            getattr(node, attr, None) for attr in ('code', 'block')
+        ]
+        children.extend(getattr(node, 'next', ()))
+        return [child for child in children if isinstance(child, nodes.Node)]
+
+    def _walk(self, node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(self._children(node)))
+
+    def constant_value(self, expression, constants):
+        """Evaluate expression if it is made of literals and constants only.
+
+        Supports what reads the same in python, jinja and django: literals,
+        `not`, `and`, `or` and comparisons. Returns `missing` otherwise.
+        """
+        if not isinstance(expression, six.string_types):
+            return missing
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except (SyntaxError, ValueError, MemoryError, RecursionError):
+            return missing
+        return self._evaluate(tree.body, constants)
+
+    def _evaluate(self, node, constants):
+        if isinstance(node, ast.Name):
+            if node.id in constants:
+                return constants[node.id]
+            return self.constant_names.get(node.id, missing)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            value = self._evaluate(node.operand, constants)
+            return missing if value is missing else not value
+        if isinstance(node, ast.BoolOp):
+            stop = isinstance(node.op, ast.Or)
+            for operand in node.values:
+                value = self._evaluate(operand, constants)
+                if value is missing or bool(value) is stop:
+                    break
+            return value
+        if isinstance(node, ast.Compare):
+            operands = [
+                self._evaluate(operand, constants)
+                for operand in [node.left] + node.comparators
+            ]
+            compares = [COMPARE_OPERATORS.get(op.__class__) for op in node.ops]
+            if any(value is missing for value in operands) or None in compares:
+                return missing
+            try:
+                return all(
+                    compare(left, right)
+                    for compare, left, right in zip(compares, operands, operands[1:])
+                )
+            except TypeError:
+                return missing
+        if isinstance(node, ast.BinOp):
+            # arithmetic on numbers and joining strings read the same everywhere
+            left = self._evaluate(node.left, constants)
+            right = self._evaluate(node.right, constants)
+            operation = BINARY_OPERATORS.get(node.op.__class__)
+            numbers = all(isinstance(value, (int, float)) for value in (left, right))
+            strings = isinstance(node.op, ast.Add) and all(
+                isinstance(value, six.string_types) for value in (left, right)
+            )
+            if operation is None or not (numbers or strings):
+                return missing
+            try:
+                return operation(left, right)
+            except ArithmeticError:
+                return missing
+        try:
+            value = ast.literal_eval(node)
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            return missing
+        return value if isinstance(value, FOLDABLE_TYPES) else missing
+
+    def safe_expression(self, expression):
+        """Tell if expression renders without any character html escapes.
+
+        That is numbers and booleans made of literals, constants, loop
+        counters of the engine and arithmetic on them, or a string literal
+        or constant free of such characters. Anything else is not safe.
+        """
+        if not isinstance(expression, six.string_types):
+            return False
+        try:
+            tree = ast.parse(expression.strip(), mode='eval')
+        except (SyntaxError, ValueError, MemoryError, RecursionError):
+            return False
+        node = tree.body
+        if isinstance(node, ast.Name):
+            value = self.constants.get(node.id)
+        elif isinstance(node, ast.Constant):
+            value = node.value
+        else:
+            value = None
+        if isinstance(value, six.string_types):
+            return self.html_escape(value) == value and not set('"\'') & set(value)
+        return self._is_number(node)
+
+    def _is_number(self, node):
+        if isinstance(node, ast.Constant):
+            return isinstance(node.value, (int, float))
+        if isinstance(node, ast.Name):
+            return isinstance(self.constants.get(node.id), (int, float))
+        if isinstance(node, ast.Attribute):
+            return (
+                self.loops > 0
+                and isinstance(node.value, ast.Name)
+                and node.value.id not in self._bound_names
+                and node.attr in self.loop_counters.get(node.value.id, ())
+            )
+        if isinstance(node, ast.UnaryOp):
+            return isinstance(node.op, ast.Not) or (
+                isinstance(node.op, (ast.UAdd, ast.USub))
+                and self._is_number(node.operand)
+            )
+        if isinstance(node, ast.BinOp):
+            return (
+                isinstance(node.op, NUMBER_OPERATORS)
+                and self._is_number(node.left)
+                and self._is_number(node.right)
+            )
+        if isinstance(node, ast.Compare):
+            operands = [node.left] + node.comparators
+        elif isinstance(node, ast.BoolOp):
+            operands = node.values
+        elif isinstance(node, ast.IfExp):
+            operands = [node.body, node.orelse]
+        else:
+            return False
+        return all(self._is_number(operand) for operand in operands)
+
+    def fold_conditional(self, conditional):
+        """Drop the branches of conditional known to be skipped at compile time.
+
+        Returns conditional itself if nothing is known, a new conditional made
+        of the remaining branches, the block of a branch that is always taken
+        or None if no branch ever is.
+        """
+        folded = self._folded_conditionals.get(conditional, missing)
+        if folded is not missing and not self.unrolled:
+            return folded
+        constants = self.constants
+        chain = self._branches(conditional)
+        branches = []
+        for branch in chain:
+            value = True
+            if branch.type != 'else':
+                value = self.constant_value(branch.sentence, constants)
+            if value is missing:
+                branches.append(branch)
+                continue
+            if branch.type == 'unless':
+                value = not value
+            if value:
+                # the branches after this one are never reached
+                if branch.type != 'else':
+                    branch = nodes.Conditional('else', '', branch.block)
+                branches.append(branch)
+                break
+
+        if branches == chain:
+            folded = conditional
+        elif not branches:
+            folded = None
+        elif branches[0].type == 'else':
+            folded = branches[0].block
+        else:
+            first = branches[0]
+            type = first.type if first.type in ('if', 'unless') else 'if'
+            folded = nodes.Conditional(type, first.sentence, first.block)
+            for branch in branches[1:]:
+                folded.append(
+                    nodes.Conditional(branch.type, branch.sentence, branch.block)
+                )
+        if not self.unrolled:
+            self._folded_conditionals[conditional] = folded
+        return folded
+
+    def _branches(self, conditional):
+        branches = [conditional]
+        for next in conditional.next:
+            branches.extend(self._branches(next))
+        return branches
+
     def visitConditional(self, conditional):
         TYPE_CODE = {
             'if': lambda x: 'if %s' % x,
@@ -352,7 +1402,7 @@ class Compiler(object):
             'elif': lambda x: 'elif %s' % x,
             'else': lambda x: 'else',
         }
-        self.buf.append(
+        self.buffer(
             '{%% %s %%}' % TYPE_CODE[conditional.type](conditional.sentence)
         )
         if conditional.block:
@@ -360,14 +1410,14 @@ class Compiler(object):
             for next in conditional.next:
                 self.visitConditional(next)
         if conditional.type in ['if', 'unless']:
-            self.buf.append('{% endif %}')
+            self.buffer('{% endif %}')
 
     def visitVar(self, var, escape=False):
         var = self.var_processor(var)
         return '%s%s%s%s' % (
             self.variable_start_string,
             var,
-            '|escape' if escape else '',
+            '|escape' if escape and not self.safe_expression(var) else '',
             self.variable_end_string,
         )
 
@@ -375,9 +1425,9 @@ class Compiler(object):
         if code.buffer:
             val = code.val.lstrip()
 
-            self.buf.append(self.visitVar(val, code.escape))
+            self.buffer(self.visitVar(val, code.escape))
         else:
-            self.buf.append('{%% %s %%}' % code.val)
+            self.buffer('{%% %s %%}' % code.val)
 
         if code.block:
             # if not code.buffer: self.buf.append('{')
@@ -387,15 +1437,15 @@ class Compiler(object):
             if not code.buffer:
                 code_tag = code.val.strip().split(' ', 1)[0]
                 if code_tag in self.auto_close_code:
-                    self.buf.append('{%% end%s %%}' % code_tag)
+                    self.buffer('{%% end%s %%}' % code_tag)
 
     def visitEach(self, each):
-        self.buf.append(
+        self.buffer(
             '{%% for %s in %s|__pypugjs_iter:%d %%}'
             % (','.join(each.keys), each.obj, len(each.keys))
         )
         self.visit(each.block)
-        self.buf.append('{% endfor %}')
+        self.buffer('{% endfor %}')
 
     def attributes(self, attrs):
         return "%s__pypugjs_attrs(%s)%s" % (
@@ -404,28 +1454,122 @@ class Compiler(object):
             self.variable_end_string,
         )
 
+    def _literal_value(self, val):
+        """Evaluate an attribute value written as a python literal or constant.
+
+        Returns `missing` for anything that has to be evaluated at render time.
+        """
+        if not isinstance(val, six.string_types):
+            return missing
+        try:
+            value = ast.literal_eval(val.strip())
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            return self.constant_value(val, self.constants)
+        if not isinstance(value, FOLDABLE_TYPES):
+            return missing
+        return value
+
+    def _template_safe(self, text):
+        """Tell if text can be put into the template source as it is."""
+        markers = TEMPLATE_MARKERS + (self.variable_start_string,)
+        return not any(marker in text for marker in markers)
+
+    def _fold_attribute(self, name, value):
+        """Render a literal attribute the same way the runtime would."""
+        try:
+            html = _attrs([(name, value)], terse=self.terse_attributes)
+        except Exception:
+            return None
+        if not self._template_safe(html):
+            return None
+        return html
+
+    def _class_expression(self, classes, values):
+        """Merge consecutive literal classes into one precomputed string."""
+        parts, merged = [], None
+        for val, value in zip(classes, values):
+            if value is not missing:
+                try:
+                    value = extract_classes(value)
+                except Exception:
+                    value = missing
+            if value is not missing and self._template_safe(' '.join(value)):
+                merged = (merged or ()) + value
+                continue
+            if merged:
+                parts.append(repr(u' '.join(merged)))
+            merged = None
+            parts.append('(%s)' % val)
+        if merged:
+            parts.append(repr(u' '.join(merged)))
+        if len(classes) > 1 and len(parts) == 1:
+            # keep the value a tuple, the runtime treats single values differently
+            return '%s ,' % parts[0]
+        return ' , '.join(parts)
+
+    def specialized_attributes(self, names, values):
+        """Return a call to a renderer specialized for the attribute names.
+
+        Backends that ship `runtime.attrs_renderer` override this, returning
+        None falls back to the generic `attributes` call.
+        """
+        return None
+
+    def _buffer_runtime_attributes(self, attrs):
+        if not attrs:
+            return
+        names = tuple(name for name, _ in attrs)
+        values = [val for _, val in attrs]
+        code = self.specialized_attributes(names, values)
+        if code is None:
+            params = {}
+            if self.terse_attributes:
+                params['terse'] = 'True'
+            params['attrs'] = '[%s]' % ', '.join(
+                ("('%s', %s)" if name == 'class' else "('%s',%s)") % (name, val)
+                for name, val in attrs
+            )
+            code = self.attributes(
+                ', '.join(['%s=%s' % (n, v) for n, v in six.iteritems(params)])
+            )
+        self.buffer(code)
+
+    def _class_attribute(self, classes):
+        values = [self._literal_value(val) for val in classes]
+        if missing not in values:
+            value = values[0] if len(values) == 1 else tuple(values)
+            folded = self._fold_attribute('class', value)
+            if folded is not None:
+                return folded, None
+            values = [missing] * len(values)
+        return None, ('class', '(%s)' % self._class_expression(classes, values))
+
     def visitDynamicAttributes(self, attrs):
-        buf, classes, params = [], [], {}
-        terse = 'terse=True' if self.terse else ''
+        # literal values are rendered right away as long as that keeps the
+        # attribute order and doesn't split the runtime call in two
+        entries, classes = [], []
         for attr in attrs:
             if attr['name'] == 'class':
-                classes.append('(%s)' % attr['val'])
-            else:
-                pair = "('%s',(%s))" % (attr['name'], attr['val'])
-                buf.append(pair)
-
+                classes.append(attr['val'])
+                continue
+            value = self._literal_value(attr['val'])
+            folded = None
+            if value is not missing:
+                folded = self._fold_attribute(attr['name'], value)
+            entries.append((folded, (attr['name'], '(%s)' % attr['val'])))
         if classes:
-            classes = " , ".join(classes)
-            buf.append("('class', (%s))" % classes)
-
-        buf = ', '.join(buf)
-        if self.terse:
-            params['terse'] = 'True'
-        if buf:
-            params['attrs'] = '[%s]' % buf
-        param_string = ', '.join(['%s=%s' % (n, v) for n, v in six.iteritems(params)])
-        if buf or terse:
-            self.buf.append(self.attributes(param_string))
+            entries.append(self._class_attribute(classes))
+
+        start, end = 0, len(entries)
+        while start < end and entries[start][0] is not None:
+            start += 1
+        while end > start and entries[end - 1][0] is not None:
+            end -= 1
+        for folded, _ in entries[:start]:
+            self.buffer(folded)
+        self._buffer_runtime_attributes([attr for _, attr in entries[start:end]])
+        for folded, _ in entries[end:]:
+            self.buffer(folded)
 
     def visitAttributes(self, attrs):
         temp_attrs = []
@@ -436,14 +1580,18 @@ class Compiler(object):
                     temp_attrs = []
                 n, v = attr['name'], attr['val']
                 if isinstance(v, six.string_types):
-                    if self.useRuntime or attr['static']:
-                        self.buf.append(' %s=%s' % (n, v))
+                    if self.minify and not self.xml and attr['static'] and (
+                        nodes.Tag.static(v, only_remove=True) == n
+                    ):
+                        self.buffer(' %s' % (n,))
+                    elif self.useRuntime or attr['static']:
+                        self.buffer(' %s=%s' % (n, v))
                     else:
-                        self.buf.append(' %s="%s"' % (n, self.visitVar(v)))
+                        self.buffer(' %s="%s"' % (n, self.visitVar(v)))
                 elif v is True:
                     # For boolean attributes, prefer presence form regardless of doctype
                     # (e.g., checked, selected, v-else)
-                    self.buf.append(' %s' % (n,))
+                    self.buffer(' %s' % (n,))
             else:
                 temp_attrs.append(attr)
 
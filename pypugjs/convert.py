@@ -3,7 +3,7 @@ import os
 import sys
 from optparse import OptionParser
 
-from pypugjs.utils import process
+from pypugjs.utils import process_iter
 
 
 def convert_file():
@@ -14,6 +14,7 @@ def convert_file():
         'underscore',
         'mako',
         'tornado',
+        'python',
     ]
 
     usage = "usage: %prog [options] [file [output]]"
@@ -70,7 +71,7 @@ def convert_file():
     else:
         template = codecs.getreader('utf-8')(sys.stdin).read()
 
-    output = process(
+    output = process_iter(
         template,
         compiler=compiler_class,
         staticAttrs=True,
@@ -79,11 +80,11 @@ def convert_file():
 
     if file_output:
         with codecs.open(file_output, 'w', encoding='utf-8') as outfile:
-            outfile.write(output)
+            outfile.writelines(output)
     elif six.PY3:
-        sys.stdout.write(output)
+        sys.stdout.writelines(output)
     else:
-        codecs.getwriter('utf-8')(sys.stdout).write(output)
+        codecs.getwriter('utf-8')(sys.stdout).writelines(output)
 
 
 if __name__ == '__main__':
@@ -1,3 +1,4 @@
+import six
 from django.conf import settings
 from django.utils.encoding import force_str as to_text
 from django.utils.translation import template
@@ -28,12 +29,22 @@ class Compiler(_Compiler):
         'verbatim',
     ]
     useRuntime = True
+    # numbers are localized when django renders them
+    inline_types = six.string_types
+    # true, false and null are just variables to django
+    constant_names = {'True': True, 'False': False, 'None': None}
 
-    def __init__(self, node, **options):
+    def __init__(self, node=None, **options):
+        # read once, a loader reuses its compiler for every template
         if settings.configured:
             options.update(getattr(settings, 'PYPUGJS', {}))
         super(Compiler, self).__init__(node, **options)
 
+    def safe_expression(self, expression):
+        # escaping turns numbers into text before django localizes them,
+        # which is the faster path and keeps the output the same
+        return False
+
     def visitCodeBlock(self, block):
         self.buffer('{%% block %s %%}' % block.name)
         if block.mode == 'append':
@@ -62,9 +73,9 @@ class Compiler(_Compiler):
         if code.buffer:
             val = code.val.lstrip()
             val = self.var_processor(val)
-            self.buf.append('{{%s%s}}' % (val, '|force_escape' if code.escape else ''))
+            self.buffer('{{%s%s}}' % (val, '|force_escape' if code.escape else ''))
         else:
-            self.buf.append('{%% %s %%}' % code.val)
+            self.buffer('{%% %s %%}' % code.val)
 
         if code.block:
             self.visit(code.block)
@@ -72,7 +83,7 @@ class Compiler(_Compiler):
             if not code.buffer:
                 code_tag = code.val.strip().split(' ', 1)[0]
                 if code_tag in self.auto_close_code:
-                    self.buf.append('{%% end%s %%}' % code_tag)
+                    self.buffer('{%% end%s %%}' % code_tag)
 
     def attributes(self, attrs):
         return "{%% __pypugjs_attrs %s %%}" % attrs
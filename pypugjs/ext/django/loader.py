@@ -2,10 +2,12 @@ from __future__ import absolute_import
 
 import os
 import re
+import threading
 
 from django.conf import settings
 from django.template import TemplateDoesNotExist
 from django.template.loaders import cached
+from django.utils import translation
 
 from pypugjs.utils import process
 from .compiler import Compiler
@@ -14,6 +16,11 @@ from .compiler import Compiler
 class Loader(cached.Loader):
     is_usable = True
 
+    def __init__(self, *args, **kwargs):
+        super(Loader, self).__init__(*args, **kwargs)
+        # compilers aren't thread safe, every thread configures its own once
+        self._local = threading.local()
+
     def include_pug_sources(self, contents):
         """Lets fetch top level pug includes to enable  mixins"""
         match = re.search(r'^include (.*)$', contents, re.MULTILINE)
@@ -31,10 +38,35 @@ class Loader(cached.Loader):
         if os.path.splitext(origin.template_name)[1] in ('.pug', '.jade'):
             contents = self.include_pug_sources(contents)
             contents = process(
-                contents, filename=origin.template_name, compiler=Compiler
+                contents, filename=origin.template_name, compiler=self.compiler
             )
         return contents
 
+    @property
+    def compiler(self):
+        translates = self.translates
+        cached = getattr(self._local, 'compiler', None)
+        if cached is None or cached[0] != translates:
+            options = {}
+            if translates:
+                # the active language at compile time, see cache_key
+                options['translations'] = translation
+            cached = self._local.compiler = (translates, Compiler(**options))
+        return cached[1]
+
+    @property
+    def translates(self):
+        """Tell if `_ text` gets translated once per language on compilation."""
+        return settings.USE_I18N and getattr(settings, 'PYPUGJS', {}).get(
+            'precompile_translations', False
+        )
+
+    def cache_key(self, template_name, skip=None):
+        key = super(Loader, self).cache_key(template_name, skip)
+        if self.translates:
+            key = '%s-%s' % (key, translation.get_language())
+        return key
+
     def get_template(self, template_name, **kwargs):
         """
         Uses cache if debug is False, otherwise re-reads from file system.
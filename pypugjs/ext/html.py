@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 
+import asyncio
 import contextlib
+import functools
 import operator
 import os
 
@@ -31,6 +33,20 @@ TYPE_CODE = {
 }
 
 
+@functools.lru_cache(maxsize=4096)
+def _compiled(source, mode):
+    # expressions and code run again in every loop, every template compiled
+    return compile(source, '<template>', mode)
+
+
+async def _awaited(awaitable):
+    return await awaitable
+
+
+async def _collected(iterable):
+    return [item async for item in iterable]
+
+
 @contextlib.contextmanager
 def local_context_manager(compiler, local_context):
     old_local_context = compiler.local_context
@@ -46,12 +62,43 @@ class Compiler(pypugjs.compiler.Compiler):
     local_context = {}
     mixins = {}
     useRuntime = True
+    # loops are run right away anyway, code in an unrolled body would miss
+    # its loop variables
+    unroll_limit = 0
+
+    def reset(self):
+        super(Compiler, self).reset()
+        # what a template runs stays with its compilation
+        self.global_context = dict(type(self).global_context)
+        self.local_context = dict(type(self).local_context)
+        self.mixins = dict(type(self).mixins)
+        self.global_context.update(self.options.get('context') or {})
+        # set by render_async, compiling in a thread while it runs
+        self.loop = self.options.get('loop')
+
+    def compile_to(self, sink, node=None, encoding='utf-8'):
+        """Write the markup to the binary sink with `sink.write`, encoded.
+
+        Chunks of `compile_iter` are encoded one at a time, the markup is
+        never joined as a whole. Characters the encoding lacks become
+        character references.
+        """
+        for chunk in self.compile_iter(node):
+            sink.write(chunk.encode(encoding, 'xmlcharrefreplace'))
+
+    def _run(self, coroutine):
+        # wait for a coroutine run on the event loop of render_async
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
 
     def _do_eval(self, value):
-        if isinstance(value, six.string_types):
-            value = value.encode('utf-8')
+        if isinstance(value, six.binary_type):
+            value = value.decode('utf-8')
         try:
-            value = eval(value, self.global_context, self.local_context)
+            # eval would skip the indentation as well
+            code = _compiled(value.lstrip(' \t'), 'eval')
+            value = eval(code, self.global_context, self.local_context)
+            if self.loop is not None and hasattr(value, '__await__'):
+                value = self._run(_awaited(value))
         except Exception:
             return None
         return value
@@ -87,8 +134,18 @@ class Compiler(pypugjs.compiler.Compiler):
         esc = self.html_escape if escape else lambda x: x
         return self._interpolate(text, lambda x: esc(str(self._do_eval(x))))
 
-    def visitInclude(self, node):
-        path = os.path.join(self.options.get("basedir", os.getcwd()), node.path)
+    def resolve_tree(self, node):
+        tree = self.inherit(node, self.load_template)
+        if self.options.get('block'):
+            tree = self.only_block(tree, self.options['block'])
+        return tree
+
+    def load_template(self, path):
+        loader = self.options.get('loader')
+        if loader is not None:
+            src = self._run(loader(self.format_path(path)))
+            return pypugjs.parser.Parser(src).parse()
+        path = os.path.join(self.options.get("basedir", os.getcwd()), path)
         if os.path.exists(path):
             src = open(path, 'r').read()
         elif os.path.exists("%s.pug" % path):
@@ -97,9 +154,19 @@ class Compiler(pypugjs.compiler.Compiler):
             raise Exception("Include path doesn't exists")
 
         parser = pypugjs.parser.Parser(src)
-        block = parser.parse()
+        return parser.parse()
+
+    def visitInclude(self, node):
+        block = self.load_template(node.path)
+        if self.options.get('block'):
+            block = self.only_block(block, self.options['block'])
         self.visit(block)
 
+    def visitCodeBlock(self, block):
+        if not block.name:
+            raise CurrentlyNotSupported()
+        self.visitBlock(block)
+
     def visitExtends(self, node):
         raise CurrentlyNotSupported()
 
@@ -130,14 +197,18 @@ class Compiler(pypugjs.compiler.Compiler):
             val = self._do_eval(val)
             if code.escape:
                 val = self.html_escape(str(val))
-            self.buf.append(val)
+            self.buffer(val)
         if code.block:
             self.visit(code.block)
         if not code.buffer and not code.block:
-            six.exec_(code.val.lstrip(), self.global_context, self.local_context)
+            code = _compiled(code.val.lstrip(), 'exec')
+            six.exec_(code, self.global_context, self.local_context)
 
     def visitEach(self, each):
-        obj = iteration(self._do_eval(each.obj), len(each.keys))
+        obj = self._do_eval(each.obj)
+        if self.loop is not None and hasattr(obj, '__aiter__'):
+            obj = self._run(_collected(obj))
+        obj = iteration(obj, len(each.keys))
         for item in obj:
             local_context = {}
             if len(each.keys) > 1:
@@ -171,8 +242,8 @@ class Compiler(pypugjs.compiler.Compiler):
             classes = [six.text_type(c) for c in classes]
             params.append(('class', " ".join(classes)))
         if params:
-            self.buf.append(
-                " " + " ".join([process_param(k, v, self.terse) for (k, v) in params])
+            self.buffer(
+                " " + " ".join([process_param(k, v, self.terse_attributes) for (k, v) in params])
             )
 
 
@@ -184,3 +255,31 @@ def process_pugjs(src, **options):
     block = parser.parse()
     compiler = Compiler(block, pretty=True, **options)
     return compiler.compile()
+
+
+def render_block(src, name, context=None, **options):
+    """Render just the block `name` of src, with the code it depends on."""
+    options.setdefault('pretty', True)
+    return _render(src, context=context, block=name, **options)
+
+
+def _render(src, **options):
+    return Compiler(pypugjs.parser.Parser(src).parse(), **options).compile()
+
+
+async def render_async(src, context=None, loader=None, **options):
+    """Render src with context without blocking the event loop.
+
+    The template is evaluated in the default executor. Awaitable values
+    are awaited and asynchronous iterables collected on the loop, as are
+    the sources of includes when a `loader(path)` coroutine is given.
+    Coroutines of the context are started as tasks right away.
+    """
+    loop = asyncio.get_running_loop()
+    context = dict(
+        (name, asyncio.ensure_future(value) if asyncio.iscoroutine(value) else value)
+        for name, value in (context or {}).items()
+    )
+    options = dict(options, context=context, loader=loader, loop=loop)
+    options.setdefault('pretty', True)
+    return await loop.run_in_executor(None, functools.partial(_render, src, **options))
@@ -5,19 +5,64 @@ from jinja2.runtime import Undefined
 from markupsafe import Markup
 
 import pypugjs.runtime
-from pypugjs import Compiler as _Compiler
-from pypugjs.runtime import attrs as _attrs, iteration, open
+from pypugjs import Compiler as _Compiler, nodes
+from pypugjs.runtime import attrs as _attrs, attrs_renderer, iteration, open
 from pypugjs.utils import process
 
 ATTRS_FUNC = '__pypugjs_attrs'
+ATTRS_RENDERER_FUNC = '__pypugjs_attrs_for'
 ITER_FUNC = '__pypugjs_iter'
+# names jinja reads as literals, no macro parameter may take them either
+CONSTANT_NAMES = {
+    'true': True,
+    'false': False,
+    'none': None,
+    'True': True,
+    'False': False,
+    'None': None,
+}
+# names with a meaning of their own inside a macro
+MACRO_NAMES = {'caller', 'varargs', 'kwargs'}
+# nodes an include compiled into a macro may consist of, besides mixin calls
+SHAREABLE_NODES = (
+    'Block',
+    'BlockComment',
+    'Code',
+    'Comment',
+    'Conditional',
+    'Each',
+    'Literal',
+    'String',
+    'Tag',
+    'Text',
+)
 
 
 def attrs(attrs, terse=False):
     return Markup(_attrs(attrs, terse, Undefined))
 
 
+def attrs_for(names, terse, *values):
+    return attrs_renderer(names, terse, Undefined, Markup)(*values)
+
+
 class Compiler(_Compiler):
+    inlines_includes = True
+    constant_names = CONSTANT_NAMES
+    loop_counters = {
+        'loop': (
+            'index',
+            'index0',
+            'revindex',
+            'revindex0',
+            'length',
+            'depth',
+            'depth0',
+            'first',
+            'last',
+        )
+    }
+
     def visitCodeBlock(self, block):
         if self.mixing > 0:
             if self.mixing > 1:
@@ -61,6 +106,12 @@ class Compiler(_Compiler):
             self.visitBlock(mixin.block)
             self.buffer('{% endcall %}')
         else:
+            self.visitMixinCall(mixin)
+        self.mixing -= 1
+
+    def visitMixinCall(self, mixin):
+        bindings = self.mixin_bindings(mixin)
+        if bindings is None:
             self.buffer(
                 '%s%s(%s)%s'
                 % (
@@ -70,7 +121,15 @@ class Compiler(_Compiler):
                     self.variable_end_string,
                 )
             )
-        self.mixing -= 1
+            return
+        # a scope of its own keeps the parameters from leaking out
+        if bindings:
+            self.buffer(
+                '{%% with %s %%}' % ', '.join('%s = %s' % binding for binding in bindings)
+            )
+        self.expand_mixin(mixin)
+        if bindings:
+            self.buffer('{% endwith %}')
 
     def visitAssignment(self, assignment):
         self.buffer('{%% set %s = %s %%}' % (assignment.name, assignment.val))
@@ -80,12 +139,12 @@ class Compiler(_Compiler):
             val = code.val.lstrip()
             val = self.var_processor(val)
             escape = ''
-            if code.escape:
+            if code.escape and not self.safe_expression(val):
                 # Parentheses ensure |escape applies to the whole expression,
                 # not just the last operand (e.g. `a or b|escape` escapes only b)
                 val = '(%s)' % val
                 escape = '|escape'
-            self.buf.append(
+            self.buffer(
                 '%s%s%s%s'
                 % (
                     self.variable_start_string,
@@ -95,7 +154,7 @@ class Compiler(_Compiler):
                 )
             )
         else:
-            self.buf.append('{%% %s %%}' % code.val)
+            self.buffer('{%% %s %%}' % code.val)
 
         if code.block:
             # if not code.buffer: self.buf.append('{')
@@ -105,7 +164,7 @@ class Compiler(_Compiler):
             if not code.buffer:
                 codeTag = code.val.strip().split(' ', 1)[0]
                 if codeTag in self.auto_close_code:
-                    self.buf.append('{%% end%s %%}' % codeTag)
+                    self.buffer('{%% end%s %%}' % codeTag)
 
     def interpolate(self, text, escape=None):
         def repl(matchobj):
@@ -125,6 +184,8 @@ class Compiler(_Compiler):
                     and matchvar[-1] == matchvar[0]
                     and filter_string == '|escape'):
                 return self.html_escape(matchvar[1:-1])
+            if self.safe_expression(matchvar):
+                filter_string = ''
 
             if filter_string:
                 # Parentheses ensure |escape applies to the whole expression,
@@ -142,25 +203,90 @@ class Compiler(_Compiler):
         return self.RE_INTERPOLATE.sub(repl, text)
 
     def visitEach(self, each):
-        self.buf.append(
+        self.buffer(
             "{%% for %s in %s(%s,%d) %%}"
             % (','.join(each.keys), ITER_FUNC, each.obj, len(each.keys))
         )
         self.visit(each.block)
-        self.buf.append('{% endfor %}')
+        self.buffer('{% endfor %}')
 
-    def visitInclude(self, node):
-        path = os.path.join(
+    def compile_shared(self):
+        """Define every include used more than once as a macro.
+
+        The macro takes all names the include reads as parameters, so it
+        sees the same values as a copy put in place would.
+        """
+        self._include_macros = {}
+        counts = {}
+        for node in self._walk(self.tree):
+            if node.__class__ is nodes.Include:
+                path = self.include_path(node)
+                counts[path] = counts.get(path, 0) + 1
+        for path in sorted(counts):
+            if counts[path] < 2 or not os.path.exists(path):
+                continue
+            block = self.parse_include(path)
+            parameters = self._include_parameters(block)
+            if parameters is None:
+                continue
+            name = '__pypugjs_include_%d' % len(self._include_macros)
+            self._include_macros[path] = (name, ', '.join(parameters))
+            # no doctype from inside the macro
+            state = (self.hasCompiledTag, self.indents)
+            self.hasCompiledTag = True
+            self.indents = 0
+            self.buffer('{%% macro %s(%s) %%}' % self._include_macros[path])
+            self.visitBlock(block)
+            self.buffer('{% endmacro %}')
+            self.hasCompiledTag, self.indents = state
+
+    def _include_parameters(self, block):
+        """Return the names an include reads, None if it can't be a macro."""
+        expressions = []
+        called = set()
+        for node in self._walk(block):
+            name = node.__class__.__name__
+            if name == 'Mixin':
+                if not node.call:
+                    return None
+                called.add(node.name)
+            elif name not in SHAREABLE_NODES:
+                return None
+            if not self._collect_expressions(node, expressions):
+                return None
+        names = self._expression_names(expressions)
+        if names is None or names & MACRO_NAMES:
+            return None
+        return sorted(names | called)
+
+    def include_path(self, node):
+        return os.path.join(
             self.options.get("basedir", '.'), self.format_path(node.path)
         )
+
+    def parse_include(self, path):
         if os.path.exists(path):
             src = open(path, 'r').read()
         else:
             raise Exception("Include path doesn't exists ({})".format(path))
 
         parser = pypugjs.parser.Parser(src)
-        block = parser.parse()
-        self.visit(block)
+        return parser.parse()
+
+    def visitInclude(self, node):
+        path = self.include_path(node)
+        if path in self._include_macros:
+            self.buffer(
+                '%s%s(%s)%s'
+                % (
+                    self.variable_start_string,
+                    self._include_macros[path][0],
+                    self._include_macros[path][1],
+                    self.variable_end_string,
+                )
+            )
+            return
+        self.visit(self.parse_include(path))
 
     def attributes(self, attrs):
         return "%s%s(%s)%s" % (
@@ -170,6 +296,16 @@ class Compiler(_Compiler):
             self.variable_end_string,
         )
 
+    def specialized_attributes(self, names, values):
+        return "%s%s(%r, %s, %s)%s" % (
+            self.variable_start_string,
+            ATTRS_RENDERER_FUNC,
+            names,
+            self.terse_attributes,
+            ', '.join(values),
+            self.variable_end_string,
+        )
+
 
 class PyPugJSExtension(Extension):
     options = {}
@@ -181,6 +317,7 @@ class PyPugJSExtension(Extension):
         environment.extend(pypugjs=self)
 
         environment.globals[ATTRS_FUNC] = attrs
+        environment.globals[ATTRS_RENDERER_FUNC] = attrs_for
         environment.globals[ITER_FUNC] = iteration
         self.variable_start_string = environment.variable_start_string
         self.variable_end_string = environment.variable_end_string
@@ -1,23 +1,35 @@
+from mako.runtime import Undefined
+
 from pypugjs import Compiler as _Compiler
+from pypugjs.runtime import attrs_renderer
 from pypugjs.utils import process
 
 ATTRS_FUNC = '__pypugjs_attrs'
+ATTRS_RENDERER_FUNC = '__pypugjs_attrs_for'
 ITER_FUNC = '__pypugjs_iter'
 
 
+def attrs_for(names, terse, *values):
+    return attrs_renderer(names, terse, Undefined)(*values)
+
+
 class Compiler(_Compiler):
     useRuntime = True
 
     def compile_top(self):
         return (
             '# -*- coding: utf-8 -*-\n<%%! from pypugjs.runtime import attrs as %s, '
-            'iteration as %s\nfrom mako.runtime import Undefined %%>'
-            % (ATTRS_FUNC, ITER_FUNC)
+            'iteration as %s\nfrom pypugjs.ext.mako import attrs_for as %s\n'
+            'from mako.runtime import Undefined %%>'
+            % (ATTRS_FUNC, ITER_FUNC, ATTRS_RENDERER_FUNC)
         )
 
     def interpolate(self, text, escape=True):
-        filt = '|h' if escape else ''
-        return self._interpolate(text, lambda x: '${%s%s}' % (x, filt))
+        def repl(x):
+            filt = '|h' if escape and not self.safe_expression(x) else ''
+            return '${%s%s}' % (x, filt)
+
+        return self._interpolate(text, repl)
 
     def visitCodeBlock(self, block):
         if self.mixing > 0:
@@ -41,10 +53,27 @@ class Compiler(_Compiler):
             self.buffer('<%%call expr="%s(%s)">' % (mixin.name, mixin.args))
             self.visitBlock(mixin.block)
             self.buffer('</%call>')
+        elif self.inlinable(mixin):
+            for binding in self.mixin_bindings(mixin):
+                self.buffer('<%% %s = %s %%>' % binding)
+            self.expand_mixin(mixin)
         else:
             self.buffer('${%s(%s)}' % (mixin.name, mixin.args))
         self.mixing -= 1
 
+    def inlinable(self, call):
+        """Tell if call can be expanded in place without shadowing anything.
+
+        The parameters become variables of the whole template function, so
+        neither the template nor a surrounding def or expansion may use them.
+        """
+        if self.mixing > 1:
+            return False
+        bindings = self.mixin_bindings(call)
+        if bindings is None:
+            return False
+        return self.template_words().isdisjoint(name for name, _ in bindings)
+
     def visitAssignment(self, assignment):
         self.buffer('<%% %s = %s %%>' % (assignment.name, assignment.val))
 
@@ -64,7 +93,7 @@ class Compiler(_Compiler):
             'elif': lambda x: 'elif %s' % x,
             'else': lambda x: 'else',
         }
-        self.buf.append(
+        self.buffer(
             '\\\n%% %s:\n' % TYPE_CODE[conditional.type](conditional.sentence)
         )
         if conditional.block:
@@ -72,18 +101,21 @@ class Compiler(_Compiler):
             for next in conditional.next:
                 self.visitConditional(next)
         if conditional.type in ['if', 'unless']:
-            self.buf.append('\\\n% endif\n')
+            self.buffer('\\\n% endif\n')
 
     def visitVar(self, var, escape=False):
+        if escape and self.safe_expression(var):
+            # no `n` here, it would keep numbers from being turned into text
+            return '${%s}' % var
         return '${%s%s}' % (var, '| h' if escape else '| n')
 
     def visitCode(self, code):
         if code.buffer:
             val = code.val.lstrip()
             val = self.var_processor(val)
-            self.buf.append(self.visitVar(val, code.escape))
+            self.buffer(self.visitVar(val, code.escape))
         else:
-            self.buf.append('<%% %s %%>' % code.val)
+            self.buffer('<%% %s %%>' % code.val)
 
         if code.block:
             # if not code.buffer: self.buf.append('{')
@@ -93,19 +125,27 @@ class Compiler(_Compiler):
             if not code.buffer:
                 codeTag = code.val.strip().split(' ', 1)[0]
                 if codeTag in self.auto_close_code:
-                    self.buf.append('</%%%s>' % codeTag)
+                    self.buffer('</%%%s>' % codeTag)
 
     def visitEach(self, each):
-        self.buf.append(
+        self.buffer(
             '\\\n%% for %s in %s(%s,%d):\n'
             % (','.join(each.keys), ITER_FUNC, each.obj, len(each.keys))
         )
         self.visit(each.block)
-        self.buf.append('\\\n% endfor\n')
+        self.buffer('\\\n% endfor\n')
 
     def attributes(self, attrs):
         return "${%s(%s, undefined=Undefined) | n}" % (ATTRS_FUNC, attrs)
 
+    def specialized_attributes(self, names, values):
+        return "${%s(%r, %s, %s) | n}" % (
+            ATTRS_RENDERER_FUNC,
+            names,
+            self.terse_attributes,
+            ', '.join(values),
+        )
+
 
-def preprocessor(source):
-    return process(source, compiler=Compiler)
+def preprocessor(source, **options):
+    return process(source, compiler=Compiler, **options)
@@ -0,0 +1,683 @@
+import ast
+import asyncio
+import functools
+import hashlib
+import importlib.util
+import os
+import re
+import tempfile
+import types
+
+import six
+
+import pypugjs
+from pypugjs import Compiler as _Compiler
+from pypugjs import nodes
+from pypugjs.exceptions import CurrentlyNotSupported
+from pypugjs.runtime import open
+from pypugjs.utils import process
+
+ATTRS_FUNC = '__pypugjs_attrs'
+ATTRS_RENDERER_FUNC = '__pypugjs_attrs_for'
+ESCAPE_FUNC = '__pypugjs_escape'
+ITER_FUNC = '__pypugjs_iter'
+APPEND_FUNC = '__pypugjs_append'
+BUILTINS = '__pypugjs_builtins'
+DEPENDENCIES = '__pypugjs_dependencies'
+CONTEXT = '__pypugjs_context'
+RENDER_FUNC = '__pypugjs_render'
+RENDER_ITER_FUNC = '__pypugjs_render_iter'
+RENDER_ASYNC_FUNC = '__pypugjs_render_async'
+RENDER_TO_FUNC = '__pypugjs_render_to'
+# characters an encoding lacks become character references
+ENCODING_ERRORS = 'xmlcharrefreplace'
+# surrounds the python expressions within the markup fragments
+MARKER = u'\x00'
+# surrounds the values the async render function awaits if they are awaitable
+VALUE = u'\x01'
+# become `async ` and `await ` in the async render function, nothing otherwise
+ASYNC = u'\x02'
+AWAIT = u'\x03'
+RE_VALUE = re.compile(u'%s(.*?)%s' % (VALUE, VALUE), re.S)
+AWAITED = (
+    u'(await __pypugjs_value if __pypugjs_hasattr(__pypugjs_value := (%s), '
+    u"'__await__') else __pypugjs_value)"
+)
+INDENT = '    '
+
+
+class Statement(six.text_type):
+    """A line of python code among the markup fragments of the buffer.
+
+    `indent` is the depth of the line itself, `level` the one of whatever
+    follows, deeper if the line opens a block. `streams` tells if chunks
+    may be yielded after it and what follows, which mixins can't.
+    """
+
+    def __new__(cls, code, indent, level, streams):
+        statement = six.text_type.__new__(cls, code)
+        statement.indent = indent
+        statement.level = level
+        statement.streams = streams
+        return statement
+
+
+class Compiler(_Compiler):
+    """Compiles a template into python source defining render functions.
+
+    `__pypugjs_render` takes a dict of the context and returns the markup,
+    `__pypugjs_render_iter` yields it in chunks. Names the template reads
+    are looked up in the context once, missing ones are None.
+    """
+
+    # code, loops and mixins are python, included templates are compiled in
+    inlines_includes = True
+    # also define the coroutine `__pypugjs_render_async`
+    enable_async = False
+    # with an encoding also define `__pypugjs_render_to`, writing bytes
+    encoding = None
+
+    def __init__(self, node=None, **options):
+        self.enable_async = options.get('enable_async', self.enable_async)
+        self.encoding = options.get('encoding', self.encoding)
+        super(Compiler, self).__init__(node, **options)
+
+    def reset(self):
+        super(Compiler, self).reset()
+        self.level = 1
+        self.renderers = {}
+        self.dependencies = []
+
+    def compile_top(self):
+        return ''
+
+    def statement(self, code):
+        self.buffer(Statement(code, self.level, self.level, not self.mixing))
+
+    def open_block(self, code):
+        self.buffer(Statement(code, self.level, self.level + 1, not self.mixing))
+        self.level += 1
+
+    def close_block(self):
+        self.level -= 1
+        self.buffer(Statement(u'', self.level, self.level, not self.mixing))
+
+    def expression(self, expression, escape):
+        """Return the marker rendering expression in a markup fragment."""
+        expression = expression.strip()
+        value = VALUE + expression + VALUE
+        if escape and not self.safe_expression(expression):
+            return u'%s%s(%s)%s' % (MARKER, ESCAPE_FUNC, value, MARKER)
+        return u'%s(%s)%s' % (MARKER, value, MARKER)
+
+    def _template_safe(self, text):
+        # markup ends up in string literals, only the markers would break it
+        return MARKER not in text
+
+    def interpolate(self, text, escape=None):
+        def repl(matchobj):
+            if escape is None:
+                escaped = matchobj.group(2) == '#'
+            else:
+                escaped = escape
+            return self.expression(matchobj.group(3), escaped)
+
+        return self.RE_INTERPOLATE.sub(repl, text)
+
+    def visitCode(self, code):
+        if code.buffer:
+            val = self.var_processor(code.val.lstrip())
+            self.buffer(self.expression(val, code.escape))
+            if code.block:
+                self.visit(code.block)
+        elif code.block:
+            val = code.val.strip()
+            self.open_block(val if val.endswith(':') else val + ':')
+            self.visit(code.block)
+            self.close_block()
+        else:
+            self.statement(code.val.strip())
+
+    def visitAssignment(self, assignment):
+        self.statement('%s = %s' % (assignment.name, assignment.val.strip()))
+
+    def visitConditional(self, conditional):
+        TYPE_CODE = {
+            'if': lambda x: 'if %s:' % x,
+            'unless': lambda x: 'if not %s:' % x,
+            'elif': lambda x: 'elif %s:' % x,
+            'else if': lambda x: 'elif %s:' % x,
+            'else': lambda x: 'else:',
+        }
+        sentence = VALUE + conditional.sentence.strip() + VALUE
+        self.open_block(TYPE_CODE[conditional.type]('(%s)' % sentence))
+        if conditional.block:
+            self.visit(conditional.block)
+        self.close_block()
+        for next in conditional.next:
+            self.visitConditional(next)
+
+    def visitEach(self, each):
+        self.open_block(
+            '%sfor %s in %s(%s%s%s, %d):'
+            % (
+                ASYNC,
+                ', '.join(each.keys),
+                ITER_FUNC,
+                VALUE,
+                each.obj.strip(),
+                VALUE,
+                len(each.keys),
+            )
+        )
+        self.visit(each.block)
+        self.close_block()
+
+    def mixin_parameters(self, args):
+        """Give the parameters of a mixin without a default None as one."""
+        try:
+            arguments = ast.parse('def f(%s): pass' % args).body[0].args
+        except SyntaxError:
+            return args
+        required = len(arguments.args) - len(arguments.defaults)
+        for arg in arguments.args[:required]:
+            arguments.defaults.insert(0, ast.Constant(None))
+        return ast.unparse(arguments)
+
+    def visitMixin(self, mixin):
+        if mixin.call:
+            if mixin.block is not None:
+                raise CurrentlyNotSupported('blocks of mixin calls')
+            self.statement('%s%s(%s)' % (AWAIT, mixin.name, mixin.args))
+            return
+        self.mixing += 1
+        self.open_block(
+            '%sdef %s(%s):' % (ASYNC, mixin.name, self.mixin_parameters(mixin.args))
+        )
+        # the body renders the same wherever the mixin is called
+        state = (self.indents, self.instring, self.hasCompiledTag)
+        self.indents, self.instring = 0, False
+        self.visitBlock(mixin.block)
+        self.indents, self.instring, self.hasCompiledTag = state
+        self.mixing -= 1
+        self.close_block()
+
+    def resolve_tree(self, node):
+        tree = self.inherit(node, self.load_template)
+        if self.options.get('block'):
+            tree = self.only_block(tree, self.options['block'])
+        return tree
+
+    def load_template(self, path):
+        """Return the parsed template an include or extends names."""
+        includes = self.options.get('includes')
+        if includes is not None:
+            # read by Template.load_async beforehand
+            src = includes[self.format_path(path)]
+        else:
+            path = os.path.join(self.options.get('basedir', os.getcwd()), path)
+            if not os.path.exists(path):
+                path = self.format_path(path)
+            with open(path, 'r') as template:
+                src = template.read()
+            self.dependencies.append((path, os.stat(path).st_mtime_ns))
+        return pypugjs.parser.Parser(src).parse()
+
+    def visitCodeBlock(self, block):
+        if not block.name:
+            raise CurrentlyNotSupported('mixin blocks')
+        self.visitBlock(block)
+
+    def visitExtends(self, node):
+        raise CurrentlyNotSupported('extends below the top level')
+
+    def visitInclude(self, node):
+        block = self.load_template(node.path)
+        if self.options.get('block'):
+            block = self.only_block(block, self.options['block'])
+        self.visit(block)
+
+    def attributes(self, attrs):
+        return u'%s%s(%s)%s' % (MARKER, ATTRS_FUNC, attrs, MARKER)
+
+    def specialized_attributes(self, names, values):
+        # renderers are looked up once, when the module is loaded
+        key = (names, self.terse_attributes)
+        name = self.renderers.get(key)
+        if name is None:
+            name = self.renderers[key] = '%s_%d' % (ATTRS_FUNC, len(self.renderers))
+        values = [VALUE + value + VALUE for value in values]
+        return u'%s%s(%s)%s' % (MARKER, name, ', '.join(values), MARKER)
+
+    def append_text(self, lines, level, text, streams):
+        """Add the markup of text to lines, split at the markers."""
+        text = u''.join(text)
+        if text:
+            lines.append((level, level, tuple(text.split(MARKER)), streams))
+
+    def append_code(self, parts, encoding=None):
+        """Return the line appending the markup of parts, bytes if encoded.
+
+        The markup is encoded right here, only the values as they render.
+        """
+
+        def literal(text):
+            return repr(text.encode(encoding, ENCODING_ERRORS) if encoding else text)
+
+        if len(parts) == 1:
+            return '%s(%s)' % (APPEND_FUNC, literal(parts[0]))
+        template = u'%s'.join(part.replace('%', '%%') for part in parts[::2])
+        values = parts[1::2]
+        if encoding:
+            # escape and the attribute renderers return text already
+            values = [
+                '%s.encode(%r, %r)'
+                % (
+                    value if value.startswith('__pypugjs') else '__pypugjs_str%s' % value,
+                    encoding,
+                    ENCODING_ERRORS,
+                )
+                for value in values
+            ]
+        return '%s(%s %% (%s,))' % (APPEND_FUNC, literal(template), ', '.join(values))
+
+    def finish_buffer(self):
+        # like the source of the other engines, the markup gets stripped
+        lines, level, streams, text = [], 1, True, []
+        leading = True
+        for fragment in self.buf:
+            if isinstance(fragment, Statement):
+                text = u''.join(text)
+                if leading and level == 1:
+                    text = text.lstrip()
+                # mixin calls render markup as well
+                leading = leading and not (
+                    streams and (text or fragment.startswith(AWAIT))
+                )
+                self.append_text(lines, level, [text], streams)
+                text = []
+                if fragment:
+                    lines.append(
+                        (fragment.indent, fragment.level, fragment, fragment.streams)
+                    )
+                level, streams = fragment.level, fragment.streams
+            else:
+                text.append(fragment)
+        text = u''.join(text).rstrip()
+        self.append_text(lines, level, [text.lstrip() if leading else text], streams)
+        lines = self.copy_outer_names(lines)
+
+        body = self.function_body(lines)
+        prefetch, prefetch_async = [], []
+        for name in self.context_names(body):
+            if hasattr(six.moves.builtins, name):
+                default = '%s.%s' % (BUILTINS, name)
+            else:
+                default = repr(self.constant_names.get(name))
+            value = '%s.get(%r, %s)' % (CONTEXT, name, default)
+            prefetch.append(INDENT + '%s = %s' % (name, value))
+            prefetch_async.append(INDENT + '%s = __pypugjs_start(%s)' % (name, value))
+
+        source = [
+            'from io import StringIO as __pypugjs_StringIO',
+            'from pypugjs.ext.python import take as __pypugjs_take',
+            'from pypugjs.runtime import attrs as %s, attrs_renderer as %s'
+            % (ATTRS_FUNC, ATTRS_RENDERER_FUNC),
+            'from pypugjs.runtime import escape as %s, iteration as %s'
+            % (ESCAPE_FUNC, ITER_FUNC),
+            'import builtins as %s' % BUILTINS,
+            '%s = %r' % (DEPENDENCIES, tuple(self.dependencies)),
+        ]
+        if self.encoding:
+            source.append('__pypugjs_str = %s.str' % BUILTINS)
+        if self.enable_async:
+            source.append(
+                'from pypugjs.runtime import iteration_async as __pypugjs_iter_async'
+            )
+            source.append('from pypugjs.ext.python import start as __pypugjs_start')
+            source.append('__pypugjs_hasattr = %s.hasattr' % BUILTINS)
+        for (names, terse), name in sorted(self.renderers.items(), key=lambda x: x[1]):
+            source.append('%s = %s(%r, %s)' % (name, ATTRS_RENDERER_FUNC, names, terse))
+        source.append('def %s(%s):' % (RENDER_FUNC, CONTEXT))
+        source.append(INDENT + '__pypugjs_buf = []')
+        source.append(INDENT + '%s = __pypugjs_buf.append' % APPEND_FUNC)
+        source.extend(prefetch)
+        source.append(body)
+        source.append(INDENT + "return u''.join(__pypugjs_buf)")
+        source.append(
+            'def %s(%s, __pypugjs_chunk_size=4096):' % (RENDER_ITER_FUNC, CONTEXT)
+        )
+        source.append(INDENT + '__pypugjs_buf = __pypugjs_StringIO()')
+        source.append(INDENT + '%s = __pypugjs_buf.write' % APPEND_FUNC)
+        source.append(INDENT + '__pypugjs_tell = __pypugjs_buf.tell')
+        source.extend(prefetch)
+        source.append(self.function_body(lines, stream=True))
+        source.append(INDENT + 'if __pypugjs_tell():')
+        source.append(INDENT * 2 + 'yield __pypugjs_buf.getvalue()')
+        if self.enable_async:
+            source.append('async def %s(%s):' % (RENDER_ASYNC_FUNC, CONTEXT))
+            source.append(INDENT + '__pypugjs_buf = []')
+            source.append(INDENT + '%s = __pypugjs_buf.append' % APPEND_FUNC)
+            source.append(INDENT + '%s = __pypugjs_iter_async' % ITER_FUNC)
+            source.extend(prefetch_async)
+            source.append(self.function_body(lines, asynchronous=True))
+            source.append(INDENT + "return u''.join(__pypugjs_buf)")
+        if self.encoding:
+            source.append('def %s(%s, %s):' % (RENDER_TO_FUNC, CONTEXT, APPEND_FUNC))
+            source.extend(prefetch)
+            source.append(self.function_body(lines, encoding=self.encoding))
+            source.append(INDENT + 'pass')
+        self.buf = ['\n'.join(source) + '\n']
+
+    def function_body(self, lines, stream=False, asynchronous=False, encoding=None):
+        """Return the source of lines, yielding chunks after them if `stream`.
+
+        The `asynchronous` source awaits values, loops with `async for` and
+        defines mixins as coroutines. With an `encoding` it appends bytes.
+        """
+        body = []
+        for i, (indent, level, code, streams) in enumerate(lines):
+            if isinstance(code, tuple):
+                code = self.append_code(code, encoding)
+            if asynchronous:
+                code = RE_VALUE.sub(lambda match: AWAITED % match.group(1), code)
+                code = code.replace(ASYNC, 'async ').replace(AWAIT, 'await ')
+            else:
+                code = code.replace(VALUE, '').replace(ASYNC, '').replace(AWAIT, '')
+            body.append(INDENT * indent + code)
+            if level > indent:
+                if i + 1 == len(lines) or lines[i + 1][0] < level:
+                    body.append(INDENT * level + 'pass')
+            elif stream and streams:
+                body.append(INDENT * indent + 'if __pypugjs_tell() >= __pypugjs_chunk_size:')
+                body.append(INDENT * (indent + 1) + 'yield __pypugjs_take(__pypugjs_buf)')
+        return '\n'.join(body)
+
+    def copy_outer_names(self, lines, offset=0):
+        """Return lines with mixins starting from the values of the names
+        they assign and read.
+
+        Mixins are nested functions, `- n = n + 1` would read a local not
+        bound yet. Like with the html compiler the name stays local to the
+        mixin, starting from the value of the enclosing scope when called.
+        Mixins defined within mixins are rewritten the same way, `offset`
+        is where lines start in those of the template.
+        """
+        declared, i = [], 0
+        while i < len(lines):
+            indent, level, code, streams = lines[i]
+            if isinstance(code, tuple) or not code.lstrip(ASYNC).startswith('def '):
+                declared.append(lines[i])
+                i += 1
+                continue
+            end = i + 1
+            while end < len(lines) and lines[end][0] > indent:
+                end += 1
+            names = ', '.join(self.outer_names(lines[i:end]))
+            if names:
+                outer = '__pypugjs_outer_%d' % (offset + i)
+                declared.append((indent, indent, '%s = lambda: (%s,)' % (outer, names), False))
+                declared.append(lines[i])
+                declared.append((level, level, '%s, = %s()' % (names, outer), False))
+            else:
+                declared.append(lines[i])
+            declared.extend(self.copy_outer_names(lines[i + 1 : end], offset + i + 1))
+            i = end
+        return declared
+
+    def outer_names(self, lines):
+        """Return the names the mixin of lines assigns and reads, sorted.
+
+        Parameters don't count, nor do the bodies of mixins defined within.
+        """
+        indent = lines[0][0]
+        source = self.function_body(
+            [(line[0] - indent, line[1] - indent) + line[2:] for line in lines]
+        )
+        function = ast.parse(source).body[0]
+        parameters = set(arg.arg for arg in ast.walk(function.args) if isinstance(arg, ast.arg))
+        assigned, read = set(), set()
+        stack = list(function.body)
+        while stack:
+            node = stack.pop()
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+                continue
+            if isinstance(node, ast.AugAssign) and isinstance(node.target, ast.Name):
+                read.add(node.target.id)
+            elif isinstance(node, ast.Name):
+                (read if isinstance(node.ctx, ast.Load) else assigned).add(node.id)
+            stack.extend(ast.iter_child_nodes(node))
+        return sorted((assigned & read) - parameters)
+
+    def context_names(self, body):
+        """Return the names the render function reads, sorted."""
+        tree = ast.parse('def f():\n%s\n%spass' % (body, INDENT))
+        names = set()
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+                if not node.id.startswith('__pypugjs'):
+                    names.add(node.id)
+        return sorted(names)
+
+
+def take(buffer):
+    """Return the text of a StringIO and empty it."""
+    chunk = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    return chunk
+
+
+def start(value):
+    """Run a coroutine of the context as a task, to be awaited by every use."""
+    if asyncio.iscoroutine(value):
+        return asyncio.ensure_future(value)
+    return value
+
+
+def load_module(src, cache_dir, filename=None, cache_key=None, **options):
+    """Import the module src compiles to, compiling it only if it isn't cached.
+
+    Modules are written to cache_dir named by a hash of the source, the
+    options and the directory includes are read from, so their bytecode is
+    cached like for any other module. Those including templates that
+    changed since are compiled again.
+
+    Options other than strings, numbers and containers of them, such as
+    translations or filter functions, can't be told apart by their value:
+    `cache_key` (the locale, say) has to stand for them, a ValueError is
+    raised without.
+    """
+    basedir = os.path.abspath(options.get('basedir', os.getcwd()))
+    options_key = _key_value(options, cache_key is not None)
+    key = repr((pypugjs.__version__, src, basedir, options_key, cache_key))
+    name = 'pypugjs_%s' % hashlib.sha1(key.encode('utf-8')).hexdigest()
+    path = os.path.join(cache_dir, name + '.py')
+    if os.path.exists(path):
+        module = _import(name, path)
+        if _is_fresh(module):
+            return module
+        # a rewrite within the same second would look like the cached bytecode
+        try:
+            os.remove(importlib.util.cache_from_source(path))
+        except OSError:
+            pass
+
+    source = process(src, filename=filename, compiler=Compiler, **options)
+    os.makedirs(cache_dir, exist_ok=True)
+    descriptor, temporary = tempfile.mkstemp(prefix=name, suffix='.tmp', dir=cache_dir)
+    try:
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as module_file:
+            module_file.write(source)
+        os.replace(temporary, path)
+    except BaseException:
+        os.remove(temporary)
+        raise
+    return _import(name, path)
+
+
+def _key_value(value, keyed):
+    # what an option adds to the cache key, the same in every process; objects
+    # count by their class if the cache key given stands for them, their repr
+    # might hold their address
+    if value is None or isinstance(value, (six.string_types, bytes, bool, int, float)):
+        return value
+    if isinstance(value, dict):
+        return sorted((repr(key), _key_value(item, keyed)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return [_key_value(item, keyed) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(repr(_key_value(item, keyed)) for item in value)
+    if not keyed:
+        raise ValueError(
+            'cache_key is required to cache templates compiled with %r' % (value,)
+        )
+    return '<%s.%s>' % (type(value).__module__, type(value).__qualname__)
+
+
+def _import(name, path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def template_paths(src, extension=None):
+    """Return the paths of the templates src includes or extends, for loaders."""
+    compiler = Compiler(extension=extension)
+    paths = []
+    for node in compiler._walk(pypugjs.parser.Parser(src).parse()):
+        if isinstance(node, (nodes.Extends, nodes.Include)):
+            paths.append(compiler.format_path(node.path))
+    return paths
+
+
+def _is_fresh(module):
+    for path, mtime in getattr(module, DEPENDENCIES, ()):
+        try:
+            if os.stat(path).st_mtime_ns != mtime:
+                return False
+        except OSError:
+            return False
+    return True
+
+
+class Template(object):
+    """A template compiled to a python render function, no engine involved.
+
+    With a `cache_dir` the compiled template is imported from there, see
+    `load_module` for `cache_key`.
+    """
+
+    options = {}
+    # characters render_iter collects at least before yielding them
+    chunk_size = 4096
+    # directory compiled templates are kept in as modules, None to compile
+    # them on every instantiation
+    cache_dir = None
+
+    def __init__(self, src, filename=None, cache_dir=None, cache_key=None, **options):
+        options = dict(self.options, **options)
+        cache_dir = cache_dir or self.cache_dir
+        # render_block compiles the blocks it renders when first asked to
+        self.source = (src, filename, cache_dir, dict(options, cache_key=cache_key))
+        self.blocks = {}
+        self.encoded = {}
+        if cache_dir:
+            module = load_module(
+                src, cache_dir, filename=filename, cache_key=cache_key, **options
+            )
+        else:
+            source = process(src, filename=filename, compiler=Compiler, **options)
+            module = types.ModuleType(filename or '<template>')
+            code = compile(source, filename or '<template>', 'exec')
+            six.exec_(code, module.__dict__)
+        self.render_function = getattr(module, RENDER_FUNC)
+        self.render_iter_function = getattr(module, RENDER_ITER_FUNC)
+        self.render_async_function = getattr(module, RENDER_ASYNC_FUNC, None)
+        self.render_to_function = getattr(module, RENDER_TO_FUNC, None)
+
+    @classmethod
+    async def load_async(cls, name, loader, **options):
+        """Create the template `name`, reading it and the templates it includes
+        or extends with loader.
+
+        `loader(path)` is a coroutine returning the source of a template,
+        they are read level by level, all of a level at once. The
+        template is compiled in the default executor, with `enable_async`.
+        """
+        sources, pending = {}, [name]
+        while pending:
+            loaded = await asyncio.gather(*(loader(path) for path in pending))
+            sources.update(zip(pending, loaded))
+            included = set()
+            for src in loaded:
+                included.update(template_paths(src, options.get('extension')))
+            pending = sorted(included.difference(sources))
+        options = dict(options, enable_async=True, includes=sources)
+        create = functools.partial(cls, sources[name], filename=name, **options)
+        return await asyncio.get_running_loop().run_in_executor(None, create)
+
+    def render(self, context=None, **kwargs):
+        if kwargs or context is None:
+            context = dict(context or {}, **kwargs)
+        return self.render_function(context)
+
+    def render_iter(self, context=None, chunk_size=None, **kwargs):
+        """Yield the markup in chunks of at least `chunk_size` characters.
+
+        Chunks end after markup or mixin calls outside of mixins, the last
+        one can be shorter. Fit for WSGI and django's StreamingHttpResponse.
+        """
+        if kwargs or context is None:
+            context = dict(context or {}, **kwargs)
+        return self.render_iter_function(context, chunk_size or self.chunk_size)
+
+    def render_to(self, sink, context=None, encoding='utf-8', **kwargs):
+        """Write the markup to the binary sink with `sink.write`, encoded.
+
+        The markup of the template is encoded once, only the values are as
+        they render. Each encoding compiles a template of its own on first
+        use, unless given as the `encoding` option. Writes are small, the
+        sink had better be buffered.
+        """
+        template = self.encoded.get(encoding)
+        if template is None:
+            src, filename, cache_dir, options = self.source
+            if options.get('encoding') == encoding:
+                template = self
+            else:
+                options = dict(options, encoding=encoding)
+                template = type(self)(src, filename=filename, cache_dir=cache_dir, **options)
+            self.encoded[encoding] = template
+        if kwargs or context is None:
+            context = dict(context or {}, **kwargs)
+        template.render_to_function(context, sink.write)
+
+    def render_block(self, name, context=None, **kwargs):
+        """Render just the block `name`, with the code it depends on.
+
+        The block is compiled on first use into a template of its own,
+        leaving out all markup around it, inheritance resolved.
+        """
+        template = self.blocks.get(name)
+        if template is None:
+            src, filename, cache_dir, options = self.source
+            options = dict(options, block=name)
+            template = type(self)(src, filename=filename, cache_dir=cache_dir, **options)
+            self.blocks[name] = template
+        return template.render(context, **kwargs)
+
+    async def render_async(self, context=None, **kwargs):
+        """Return the markup, awaiting what the template renders or loops over.
+
+        Awaitable values of expressions and conditions are awaited, each
+        loops over asynchronous iterables too. Coroutines of the context the
+        template reads are started as tasks right away, so they run at the
+        same time and can be used more than once. Needs `enable_async`.
+        """
+        if self.render_async_function is None:
+            raise ValueError('the template was compiled without enable_async')
+        if kwargs or context is None:
+            context = dict(context or {}, **kwargs)
+        return await self.render_async_function(context)
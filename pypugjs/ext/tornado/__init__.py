@@ -2,14 +2,19 @@ import tornado.template
 
 from pypugjs import Compiler as _Compiler
 from pypugjs.exceptions import CurrentlyNotSupported
-from pypugjs.runtime import attrs, escape, iteration
+from pypugjs.runtime import attrs, attrs_renderer, escape, iteration
 from pypugjs.utils import process
 
 ATTRS_FUNC = '__pypugjs_attrs'
+ATTRS_RENDERER_FUNC = '__pypugjs_attrs_for'
 ESCAPE_FUNC = '__pypugjs_escape'
 ITER_FUNC = '__pypugjs_iter'
 
 
+def attrs_for(names, terse, *values):
+    return attrs_renderer(names, terse)(*values)
+
+
 class Compiler(_Compiler):
     def visitCodeBlock(self, block):
         self.buffer('{%% block %s %%}' % block.name)
@@ -21,9 +26,12 @@ class Compiler(_Compiler):
         self.buffer('{% end %}')
 
     def interpolate(self, text, escape=True):
-        return self._interpolate(
-            text, lambda x: '{%% raw %s(%s) %%}' % (ESCAPE_FUNC, x)
-        )
+        def repl(x):
+            if self.safe_expression(x):
+                return '{%% raw %s %%}' % x
+            return '{%% raw %s(%s) %%}' % (ESCAPE_FUNC, x)
+
+        return self._interpolate(text, repl)
 
     def visitMixin(self, mixin):
         raise CurrentlyNotSupported('mixin')
@@ -35,12 +43,12 @@ class Compiler(_Compiler):
         if code.buffer:
             val = code.val.lstrip()
             val = self.var_processor(val)
-            if code.escape:
-                self.buf.append('{%% raw %s(%s) %%}' % (ESCAPE_FUNC, val))
+            if code.escape and not self.safe_expression(val):
+                self.buffer('{%% raw %s(%s) %%}' % (ESCAPE_FUNC, val))
             else:
-                self.buf.append('{%% raw %s %%}' % val)
+                self.buffer('{%% raw %s %%}' % val)
         else:
-            self.buf.append('{%% %s %%}' % code.val)
+            self.buffer('{%% %s %%}' % code.val)
 
         if code.block:
             # if not code.buffer: self.buf.append('{')
@@ -50,15 +58,15 @@ class Compiler(_Compiler):
             if not code.buffer:
                 codeTag = code.val.strip().split(' ', 1)[0]
                 if codeTag in self.auto_close_code:
-                    self.buf.append('{%% end%s %%}' % codeTag)
+                    self.buffer('{%% end%s %%}' % codeTag)
 
     def visitEach(self, each):
-        self.buf.append(
+        self.buffer(
             '{%% for %s in %s(%s,%s) %%}'
             % (','.join(each.keys), ITER_FUNC, each.obj, len(each.keys))
         )
         self.visit(each.block)
-        self.buf.append('{% end %}')
+        self.buffer('{% end %}')
 
     def visitConditional(self, conditional):
         TYPE_CODE = {
@@ -67,7 +75,7 @@ class Compiler(_Compiler):
             'elif': lambda x: 'elif %s' % x,
             'else': lambda x: 'else',
         }
-        self.buf.append(
+        self.buffer(
             '{%% %s %%}' % TYPE_CODE[conditional.type](conditional.sentence)
         )
         if conditional.block:
@@ -75,22 +83,39 @@ class Compiler(_Compiler):
             for next in conditional.next:
                 self.visitConditional(next)
         if conditional.type in ['if', 'unless']:
-            self.buf.append('{% end %}')
+            self.buffer('{% end %}')
 
     def attributes(self, attrs):
         return "{%% raw %s(%s) %%}" % (ATTRS_FUNC, attrs)
 
+    def specialized_attributes(self, names, values):
+        return "{%% raw %s(%r, %s, %s) %%}" % (
+            ATTRS_RENDERER_FUNC,
+            names,
+            self.terse_attributes,
+            ', '.join(values),
+        )
+
 
 class Template(tornado.template.Template):
+    options = {}
+
     def __init__(self, template_string, name="<string>", *args, **kwargs):
         is_pugjs = name.endswith(".pug")
         if is_pugjs:
-            template_string = process(template_string, filename=name, compiler=Compiler)
+            template_string = process(
+                template_string, filename=name, compiler=Compiler, **self.options
+            )
 
         super(Template, self).__init__(template_string, name, *args, **kwargs)
         if is_pugjs:
             self.namespace.update(
-                {ATTRS_FUNC: attrs, ESCAPE_FUNC: escape, ITER_FUNC: iteration}
+                {
+                    ATTRS_FUNC: attrs,
+                    ATTRS_RENDERER_FUNC: attrs_for,
+                    ESCAPE_FUNC: escape,
+                    ITER_FUNC: iteration,
+                }
             )
 
 
@@ -17,8 +17,11 @@ def process_param(key, value, terse=False):
 
 
 class Compiler(_Compiler):
-    def __init__(self, *args, **kws):
-        _Compiler.__init__(self, *args, **kws)
+    # sentences are javascript, which python can't tell the truth of
+    fold_conditionals = False
+
+    def reset(self):
+        _Compiler.reset(self)
         self._i = count()
 
     def visitAssignment(self, assignment):
@@ -27,12 +30,12 @@ class Compiler(_Compiler):
     def visitCode(self, code):
         if code.buffer:
             val = code.val.lstrip()
-            self.buf.append('<%%%s %s %%>' % ('=' if code.escape else '-', val))
+            self.buffer('<%%%s %s %%>' % ('=' if code.escape else '-', val))
         else:
-            self.buf.append('<%% %s' % code.val)  # for loop
+            self.buffer('<%% %s' % code.val)  # for loop
 
         if code.block:
-            self.buf.append(' { %>')  # for loop
+            self.buffer(' { %>')  # for loop
             # if not code.buffer: self.buf.append('{')
             self.visit(code.block)
             # if not code.buffer: self.buf.append('}')
@@ -40,26 +43,26 @@ class Compiler(_Compiler):
             if not code.buffer:
                 codeTag = code.val.strip().split(' ', 1)[0]
                 if codeTag in self.auto_close_code:
-                    self.buf.append('<% } %>')
+                    self.buffer('<% } %>')
         elif not code.buffer:
-            self.buf.append('; %>')  # for loop
+            self.buffer('; %>')  # for loop
 
     def visitEach(self, each):
-        # self.buf.append('{%% for %s in %s %%}'%(','.join(each.keys),each.obj))
-        __i = self._i.next()
-        self.buf.append(
+        # self.buffer('{%% for %s in %s %%}'%(','.join(each.keys),each.obj))
+        __i = next(self._i)
+        self.buffer(
             '<%% for (_i_%s = 0, _len_%s = %s.length; _i_%s < _len_%s; _i_%s++) '
             '{ ' % (__i, __i, each.obj, __i, __i, __i)
         )
         if len(each.keys) > 1:
             for i, k in enumerate(each.keys):
-                self.buf.append('%s = %s[_i_%s][%s];' % (k, each.obj, __i, i))
+                self.buffer('%s = %s[_i_%s][%s];' % (k, each.obj, __i, i))
         else:
             for k in each.keys:
-                self.buf.append('%s = %s[_i_%s];' % (k, each.obj, __i))
-        self.buf.append(' %>')
+                self.buffer('%s = %s[_i_%s];' % (k, each.obj, __i))
+        self.buffer(' %>')
         self.visit(each.block)
-        self.buf.append('<% } %>')
+        self.buffer('<% } %>')
 
     def _do_eval(self, value):
         if isinstance(value, six.string_types):
@@ -97,7 +100,7 @@ class Compiler(_Compiler):
             classes = [six.text_type(c) for c in classes]
             params.append(('class', " ".join(classes)))
         if params:
-            self.buf.append(
+            self.buffer(
                 " " + " ".join([process_param(k, v, self.terse) for (k, v) in params])
             )
 
@@ -108,7 +111,7 @@ class Compiler(_Compiler):
             'elif': lambda x: '} else if (%s)' % x,
             'else': lambda x: '} else',
         }
-        self.buf.append(
+        self.buffer(
             '\n<%% %s { %%>' % TYPE_CODE[conditional.type](conditional.sentence)
         )
         if conditional.block:
@@ -116,7 +119,7 @@ class Compiler(_Compiler):
             for next in conditional.next:
                 self.visitConditional(next)
         if conditional.type in ['if', 'unless']:
-            self.buf.append('\n<% } %>\n')
+            self.buffer('\n<% } %>\n')
 
     def interpolate(self, text, escape=True):
         return self._interpolate(text, lambda x: '<%%= %s %%>' % x)
@@ -40,20 +40,26 @@ def escape(s):
     )
 
 
+def extract_classes(cls, undefined=None):
+    """Recursively extract_class from iterable and mappings"""
+    if isinstance(cls, (list, tuple)):
+        return tuple(
+            reduce(
+                lambda t1, t2: t1 + t2,
+                map(lambda c: extract_classes(c, undefined), cls),
+            )
+        )
+    if isinstance(cls, dict):
+        return tuple(
+            sorted(dict(filter(lambda x: x[1] and x[1] != undefined, cls.items())))
+        )
+    return (str(cls),)
+
+
 def attrs(attrs=None, terse=False, undefined=None):
     if attrs is None:
         attrs = []
 
-    def extract_classes(cls):
-        """Recursively extract_class from iterable and mappings"""
-        if isinstance(cls, (list, tuple)):
-            return tuple(reduce(lambda t1, t2: t1 + t2, map(extract_classes, cls)))
-        if isinstance(cls, dict):
-            return tuple(
-                sorted(dict(filter(lambda x: x[1] and x[1] != undefined, cls.items())))
-            )
-        return (str(cls),)
-
     buf = []
     if bool(attrs):
         buf.append(u'')
@@ -65,7 +71,7 @@ def attrs(attrs=None, terse=False, undefined=None):
                 buf.append(u'%s' % k)
             elif v not in (None, False):
                 if k == 'class':
-                    v = u' '.join(extract_classes(v))
+                    v = u' '.join(extract_classes(v, undefined))
                 # If terse and value equals key, collapse to presence form as well
                 if terse and (v == k):
                     buf.append(u'%s' % k)
@@ -74,6 +80,62 @@ def attrs(attrs=None, terse=False, undefined=None):
     return u' '.join(buf)
 
 
+_attrs_renderers = {}
+
+
+def _make_attrs_renderer(names, terse, undefined, wrap):
+    namespace = dict(
+        escape=escape,
+        extract_classes=extract_classes,
+        string_types=six.string_types,
+        undefined=undefined,
+        wrap=wrap,
+    )
+    code = ['def render(%s):' % ', '.join('v%d' % i for i in range(len(names)))]
+    code.append("    out = u''")
+    for i, name in enumerate(names):
+        namespace['name%d' % i] = name
+        namespace['key%d' % i] = u' %s' % name
+        namespace['prefix%d' % i] = u' %s="' % name
+        indent = '    '
+        if undefined is not None:
+            code.append('%sif not isinstance(v%d, undefined):' % (indent, i))
+            indent += '    '
+        code.append('%sif v%d is True:' % (indent, i))
+        code.append('%s    out += key%d' % (indent, i))
+        code.append('%selif v%d not in (None, False):' % (indent, i))
+        indent += '    '
+        if name == 'class':
+            code.append('%sif not isinstance(v%d, string_types):' % (indent, i))
+            code.append(
+                "%s    v%d = u' '.join(extract_classes(v%d, undefined))"
+                % (indent, i, i)
+            )
+        if terse:
+            code.append('%sif v%d == name%d:' % (indent, i, i))
+            code.append('%s    out += key%d' % (indent, i))
+            code.append('%selse:' % indent)
+            indent += '    '
+        code.append('%sout += prefix%d + escape(v%d) + \'"\'' % (indent, i, i))
+    code.append('    return wrap(out)' if wrap else '    return out')
+    six.exec_('\n'.join(code), namespace)
+    return namespace['render']
+
+
+def attrs_renderer(names, terse=False, undefined=None, wrap=None):
+    """Return a function rendering the attributes `names` like `attrs` does.
+
+    The function takes one positional value per name and only does the checks
+    these attributes need. Renderers are generated once per signature.
+    """
+    key = (names, terse, undefined, wrap)
+    try:
+        return _attrs_renderers[key]
+    except KeyError:
+        renderer = _attrs_renderers[key] = _make_attrs_renderer(*key)
+        return renderer
+
+
 def is_mapping(value):
     return isinstance(value, MappingType)
 
@@ -147,6 +209,33 @@ def iteration(obj, num_keys):
         return iter_obj
 
 
+async def iteration_async(obj, num_keys):
+    """Iterate obj like `iteration`, which may be an asynchronous iterable."""
+    if not hasattr(obj, '__aiter__'):
+        for item in iteration(obj, num_keys):
+            yield item
+        return
+
+    index = None
+    ix = 0
+    async for item in obj:
+        if index is None:
+            index = _indexing(item, num_keys)
+        yield index(item, ix)
+        ix += 1
+
+
+def _indexing(head, num_keys):
+    # the rules of `iteration`, decided by the first value
+    if is_iterable(head):
+        cardinality = get_cardinality(head)
+        if cardinality > 0 and num_keys == cardinality + 1:
+            return lambda item, ix: tuple(item) + (ix,)
+    elif num_keys == 2:
+        return lambda item, ix: (item, ix)
+    return lambda item, ix: item
+
+
 def open(
     file, mode='r', buffering=-1, encoding=None, errors=None, newline=None, closefd=True
 ):
@@ -6,6 +6,7 @@ from pathlib import Path
 
 import pypugjs
 import pypugjs.ext.html
+import pypugjs.ext.python
 import pytest
 import six
 from django.template import Engine
@@ -176,6 +177,16 @@ def html_process(src, filename):
 processors["Html"] = html_process
 
 
+def python_process(src, filename):
+    template = pypugjs.ext.python.Template(
+        src, pretty=True, basedir=str(Path(__file__).parent / "cases")
+    )
+    return template.render()
+
+
+processors["Python"] = python_process
+
+
 def run_case(case, process):
 
     processor = processors[process]
@@ -234,6 +245,7 @@ exclusions = {
     # its a pity - the html compiler has the better results for mixins (indentation) but
     # has to be excluded to not "break" the other tests with their false results (bad expected indentation)
     "Html": {
+        "inheritance",
         "mixins",
         "mixin.blocks",
         "layout",
@@ -243,6 +255,14 @@ exclusions = {
         "included_top_level",
         "included_nested_level",
     },
+    "Python": {
+        # blocks are compiled in with their indentation, the expected markup is
+        # the one of engines rendering them at the start of the line
+        "inheritance",
+        "layout",
+        "included_top_level",
+        "included_nested_level",
+    },
     "Mako": {
         "layout",
         "include_mixin",
@@ -271,6 +291,8 @@ exclusions = {
         "layout",
         "included_top_level",
         "included_nested_level",
+        # python literals and range() in each are no django syntax
+        "code.iteration.unroll",
     },
 }
 
@@ -0,0 +1,66 @@
+"""Test that one compiler instance can compile many templates.
+
+Every ``compile`` starts from the options given to the constructor, so a
+doctype, open tags or mixins of one template never reach the next.
+"""
+
+import pytest
+
+from pypugjs.ext.html import Compiler as HTMLCompiler, _compiled
+from pypugjs.ext.jinja import Compiler
+from pypugjs.parser import Parser
+from pypugjs.utils import process, process_iter
+
+SOURCES = [
+    'doctype xml\nfoo\n  bar',
+    'br\nmixin m(x)\n  p= x\n+m(1)',
+    'pre\n  | a\n  |  b\ndiv: span',
+    'each x in xs\n  p= x',
+]
+
+
+def _parse(src):
+    return Parser(src).parse()
+
+
+class TestReuse:
+    def test_same_output_as_fresh_instances(self):
+        compiler = Compiler(pretty=False)
+        for src in SOURCES + SOURCES:
+            fresh = Compiler(_parse(src), pretty=False).compile()
+            assert compiler.compile(_parse(src)) == fresh
+
+    def test_doctype_does_not_leak(self):
+        compiler = Compiler()
+        compiler.compile(_parse('doctype xml\nbr'))
+        assert compiler.compile(_parse('br')) == Compiler(_parse('br')).compile()
+
+    def test_html_context_does_not_leak(self):
+        compiler = HTMLCompiler()
+        compiler.compile(_parse('- x = 1\nmixin m()\n  p'))
+        result = compiler.compile(_parse('p= x'))
+        assert result == HTMLCompiler(_parse('p= x')).compile()
+        assert compiler.mixins == {}
+
+    def test_process_with_instance(self):
+        compiler = Compiler(pretty=False)
+        assert process('p a', compiler=compiler) == '<p>a</p>'
+        assert process('p b', compiler=compiler) == '<p>b</p>'
+
+    def test_process_refuses_options_with_instance(self):
+        with pytest.raises(TypeError):
+            process('p a', compiler=Compiler(), minify=True)
+        with pytest.raises(TypeError):
+            process_iter('p a', compiler=Compiler(), minify=True)
+
+
+class TestHTMLExpressionCache:
+    def test_compiled_once(self):
+        src = 'each x in range(3)\n  - y = x * 2\n  p(class=x)= y\np= missing'
+        first = HTMLCompiler(pretty=False).compile(_parse(src))
+        misses = _compiled.cache_info().misses
+        assert HTMLCompiler(pretty=False).compile(_parse(src)) == first
+        assert _compiled.cache_info().misses == misses
+        assert first == (
+            '<p class="0">0</p><p class="1">2</p><p class="2">4</p><p>None</p>'
+        )
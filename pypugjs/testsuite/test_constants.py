@@ -0,0 +1,25 @@
+"""Test constants inlined at compile time for templates read together."""
+
+from jinja2 import DictLoader, Environment
+
+from pypugjs.ext.jinja import PyPugJSExtension
+
+TEMPLATES = {
+    'layout.pug': "- var site = 'Site'\nh1 #{site}\nblock content\n",
+    'page.pug': 'extends layout.pug\nblock content\n  p= site\n',
+    'brand.pug': "- var brand = 'Brand'\n",
+    'import.pug': "- import 'brand.pug' as l\np= l.brand\n",
+}
+
+
+def _render(name, **ctx):
+    env = Environment(extensions=[PyPugJSExtension], loader=DictLoader(TEMPLATES))
+    return env.get_template(name).render(**ctx).strip()
+
+
+class TestSharedConstants:
+    def test_layout_constants_reach_child_blocks(self):
+        assert _render('page.pug') == '<h1>Site</h1>\n<p>Site</p>'
+
+    def test_imported_constants(self):
+        assert _render('import.pug') == '<p>Brand</p>'
@@ -0,0 +1,69 @@
+"""Test compiling includes used more than once into a shared macro."""
+
+from jinja2 import Environment
+
+from pypugjs.ext.jinja import Compiler, PyPugJSExtension
+from pypugjs.utils import process
+
+CARD = 'li.card(class=kind)\n  a(href=item.url) #{item.title}\n  +badge(item)\n'
+SRC = '''mixin badge(x)
+  b= x.title
+ul
+  each item in items
+    include card
+  li
+    - var item = extra
+    include card
+'''
+
+
+def _compile(tmp_path, partial, src=SRC):
+    (tmp_path / 'card.pug').write_text(partial)
+    return process(src, compiler=Compiler, basedir=str(tmp_path))
+
+
+def _render(src, **ctx):
+    env = Environment(extensions=[PyPugJSExtension])
+    return env.from_string(src).render(**ctx)
+
+
+class TestIncludeMacros:
+    def test_defined_once(self, tmp_path):
+        result = _compile(tmp_path, CARD)
+        assert result.startswith('{% macro __pypugjs_include_0(badge, item, kind) %}')
+        assert result.count('<a') == 1
+        assert result.count('__pypugjs_include_0(badge, item, kind)}}') == 2
+
+    def test_renders_like_copies(self, tmp_path):
+        ctx = {
+            'items': [{'url': '/a', 'title': '<A>'}],
+            'extra': {'url': '/x', 'title': 'X'},
+            'kind': 'k',
+        }
+        shared = _render(_compile(tmp_path, CARD), **ctx)
+        # raw jinja syntax keeps the compiler from looking into the include
+        copied = _compile(tmp_path, "| {{ '' }}\n" + CARD)
+        assert '__pypugjs_include' not in copied
+        copies = _render(copied, **ctx)
+        assert shared.split() == copies.split()
+        assert '<a href="/a">&lt;A&gt;</a>' in shared
+
+    def test_single_include_stays_inline(self, tmp_path):
+        result = _compile(tmp_path, CARD, 'ul\n  include card')
+        assert 'macro' not in result
+
+    def test_includes_with_statements_stay_inline(self, tmp_path):
+        result = _compile(tmp_path, '- var kind = "x"\n' + CARD)
+        assert '__pypugjs_include' not in result
+        assert result.count('<a') == 2
+
+    def test_jinja_literals_are_no_parameters(self, tmp_path):
+        partial = 'if x is none\n  p none\nelse\n  p= x\n'
+        result = _compile(tmp_path, partial, 'include card\ninclude card')
+        assert '{% macro __pypugjs_include_0(x) %}' in result
+        assert _render(result, x=1).split() == ['<p>1</p>', '<p>1</p>']
+        assert _render(result, x=None).split() == ['<p>none</p>', '<p>none</p>']
+
+    def test_includes_reading_macro_names_stay_inline(self, tmp_path):
+        result = _compile(tmp_path, 'p= kwargs\n', 'include card\ninclude card')
+        assert '__pypugjs_include' not in result
@@ -0,0 +1,64 @@
+"""Test the ``minify`` compiler option.
+
+Minified output drops comments and indentation, collapses whitespace in
+text outside of preformatted tags and shortens boolean attributes, while
+the default output stays untouched.
+"""
+
+from jinja2 import Environment
+
+from pypugjs.ext.jinja import Compiler
+from pypugjs.parser import Parser
+
+
+def _compile(src: str, **options) -> str:
+    block = Parser(src).parse()
+    return Compiler(block, **options).compile()
+
+
+def _render(template_str: str, **ctx) -> str:
+    env = Environment(autoescape=False)
+    env.globals.update(_globals())
+    return env.from_string(template_str).render(**ctx)
+
+
+def _globals():
+    from pypugjs.ext.jinja import ATTRS_FUNC, ATTRS_RENDERER_FUNC, attrs, attrs_for
+
+    return {ATTRS_FUNC: attrs, ATTRS_RENDERER_FUNC: attrs_for}
+
+
+class TestMinify:
+    def test_drops_indentation_and_comments(self):
+        src = 'div\n  // note\n  p one\n  p two'
+        assert _compile(src, minify=True) == '<div><p>one</p><p>two</p></div>'
+
+    def test_keeps_conditional_comments(self):
+        src = '//if IE 8\n  p old'
+        assert _compile(src, minify=True) == '<!--[if IE 8]><p>old</p><![endif]-->'
+
+    def test_collapses_text_whitespace(self):
+        src = 'p\n  | foo\n  |   bar\n  |\n  | baz'
+        assert _compile(src, minify=True) == '<p>foo bar baz</p>'
+
+    def test_keeps_code_whitespace(self):
+        src = 'p a   #{"x    y"}   b\np {{ "x    y" }}  c'
+        result = _compile(src, minify=True)
+        assert _render(result) == '<p>a x    y b</p><p>x    y c</p>'
+
+    def test_keeps_preformatted_text(self):
+        src = 'pre\n  | foo\n  |   bar\np.\n  foo\n    bar'
+        result = _compile(src, minify=True)
+        assert result == '<pre>foo\n  bar</pre><p>foo bar</p>'
+
+    def test_boolean_attributes(self):
+        src = 'input(type="checkbox", checked="checked")'
+        assert _compile(src, minify=True) == '<input type="checkbox" checked/>'
+
+    def test_dynamic_boolean_attributes(self):
+        result = _render(_compile('option(selected=value)', minify=True), value='selected')
+        assert result == '<option selected></option>'
+
+    def test_default_output_unchanged(self):
+        src = 'div\n  // note\n  p one'
+        assert _compile(src) == '\n<div>\n  <!-- note-->\n  <p>one</p>\n</div>'
@@ -0,0 +1,79 @@
+"""Test expanding small mixins at their call sites (``inline_mixins``)."""
+
+import pytest
+from jinja2 import Environment
+from mako.template import Template as MakoTemplate
+
+import pypugjs.ext.mako
+from pypugjs.ext.jinja import Compiler, PyPugJSExtension
+from pypugjs.utils import process
+
+ICON = '''mixin icon(glyph, size=16)
+  i(class='icon-'+glyph, data-size=size) #{glyph}
+'''
+
+
+def _compile(src: str, **options) -> str:
+    return process(src, compiler=Compiler, inline_mixins=8, **options)
+
+
+def _render_jinja(src, **ctx):
+    env = Environment(extensions=[PyPugJSExtension])
+    return env.from_string(src).render(**ctx)
+
+
+class TestJinja:
+    def test_expands_call(self):
+        result = _compile(ICON + '+icon(name)')
+        assert '{% with glyph = name, size = 16 %}' in result
+        assert '{{icon(' not in result
+
+    def test_keyword_arguments(self):
+        result = _compile(ICON + '+icon(name, size=32)')
+        assert '{% with glyph = name, size = 32 %}' in result
+
+    @pytest.mark.parametrize(
+        'src',
+        [
+            # refers to a name it isn't passed
+            'mixin m()\n  p= item\n+m()',
+            # more nodes than allowed
+            'mixin m()\n' + '  p a\n' * 9 + '+m()',
+            # binds names of its own
+            'mixin m(x)\n  each i in x\n    p= i\n+m(y)',
+            # raw template syntax
+            'mixin m(x)\n  p {{ x }}\n+m(y)',
+            # not enough arguments
+            ICON + '+icon()',
+            'mixin m(x)\n  p= x\n+m(*args)',
+        ],
+    )
+    def test_keeps_call(self, src):
+        assert '{% with' not in _compile(src)
+
+    def test_off_by_default(self):
+        assert '{% with' not in process(ICON + '+icon(name)', compiler=Compiler)
+
+    def test_renders_the_same(self):
+        src = ICON + 'each name in names\n  +icon(name)\n  +icon(name, size=2)\np= glyph'
+        ctx = {'names': ['a', '<b>'], 'glyph': 'outer'}
+        expanded = _render_jinja(_compile(src), **ctx)
+        called = _render_jinja(process(src, compiler=Compiler), **ctx)
+        assert expanded.split() == called.split()
+        assert '<p>outer</p>' in expanded
+
+
+class TestMako:
+    def _compile(self, src):
+        return pypugjs.ext.mako.preprocessor(src, inline_mixins=8)
+
+    def test_expands_call(self):
+        result = self._compile(ICON + '+icon(name)')
+        assert '<% glyph = name %><% size = 16 %>' in result
+        assert MakoTemplate(result).render(name='a').strip().endswith(
+            '<i data-size="16" class="icon-a">a</i>'
+        )
+
+    def test_keeps_call_shadowing_template_names(self):
+        result = self._compile(ICON + '+icon(name)\np= glyph')
+        assert '${icon(name)}' in result
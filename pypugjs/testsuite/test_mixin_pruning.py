@@ -0,0 +1,47 @@
+"""Test leaving out the definitions of mixins a template never calls."""
+
+from pypugjs.ext.jinja import Compiler
+from pypugjs.ext.mako import Compiler as MakoCompiler
+from pypugjs.utils import process
+
+LIBRARY = '''
+mixin used()
+  p used #{helper()}
+mixin helper()
+  | helped
+mixin unused()
+  +orphan()
+mixin orphan()
+  p orphan
+'''
+
+
+def _compile(src: str, compiler=Compiler, **options) -> str:
+    return process(src, compiler=compiler, pretty=False, **options)
+
+
+class TestMixinPruning:
+    def test_drops_unreached_definitions(self):
+        result = _compile(LIBRARY + '+used()')
+        assert 'macro used(' in result
+        assert 'macro unused(' not in result
+        assert 'macro orphan(' not in result
+
+    def test_follows_calls_through_definitions(self):
+        assert 'macro helper(' in _compile(LIBRARY + '+used()')
+
+    def test_mako(self):
+        result = _compile(LIBRARY + '+used()', MakoCompiler)
+        assert '<%def name="helper()">' in result
+        assert '<%def name="orphan()">' not in result
+
+    def test_keeps_libraries(self):
+        assert 'macro orphan(' in _compile(LIBRARY)
+
+    def test_keeps_mixins_other_templates_can_call(self):
+        assert 'macro orphan(' in _compile('extends layout\n' + LIBRARY + '+used()')
+        assert 'macro orphan(' in _compile(LIBRARY + 'block content\n  +used()')
+
+    def test_option(self):
+        result = _compile(LIBRARY + '+used()', prune_mixins=False)
+        assert 'macro orphan(' in result
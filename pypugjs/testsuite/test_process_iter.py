@@ -0,0 +1,64 @@
+"""Test compiling a template into a stream of chunks."""
+
+import io
+
+import pytest
+
+from pypugjs.ext.html import Compiler as HTMLCompiler
+from pypugjs.ext.jinja import Compiler as JinjaCompiler
+from pypugjs.ext.mako import Compiler as MakoCompiler
+from pypugjs.parser import Parser
+from pypugjs.utils import process, process_iter, strip_fragments
+
+SRC = '''- var unused = 1
+mixin unused()
+  p never
+mixin item(x)
+  li= x
+ul
+  each x in range(10)
+    +item(x)
+pre
+  |  kept
+'''
+
+
+@pytest.mark.parametrize('compiler', [JinjaCompiler, MakoCompiler, HTMLCompiler])
+class TestProcessIter:
+    def test_same_as_process(self, compiler):
+        assert ''.join(process_iter(SRC, compiler=compiler)) == process(
+            SRC, compiler=compiler
+        )
+
+    def test_same_as_compile(self, compiler):
+        block = Parser(SRC).parse()
+        fragments = list(compiler(block).compile_iter(chunk_size=4))
+        assert len(fragments) > 1
+        assert ''.join(fragments) == compiler(block).compile()
+
+
+class TestCompileTo:
+    def test_same_as_compile(self):
+        sink = io.BytesIO()
+        HTMLCompiler(Parser(SRC).parse()).compile_to(sink)
+        assert sink.getvalue() == HTMLCompiler(Parser(SRC).parse()).compile().encode()
+
+    def test_character_references(self):
+        sink = io.BytesIO()
+        HTMLCompiler(Parser('p \u20ac').parse(), pretty=False).compile_to(sink, encoding='ascii')
+        assert sink.getvalue() == b'<p>&#8364;</p>'
+
+
+class TestStripFragments:
+    @pytest.mark.parametrize(
+        'fragments',
+        [
+            [],
+            ['  ', '\n'],
+            ['\n', ' <p>', '\n', 'a', ' ', '</p>\n', '  '],
+            ['<p>a</p>'],
+            ['  <p>', '', '\n  ', 'b  \n'],
+        ],
+    )
+    def test_same_as_strip(self, fragments):
+        assert ''.join(strip_fragments(fragments)) == ''.join(fragments).strip()
@@ -0,0 +1,45 @@
+"""Test compiling one parsed tree with several compilers."""
+
+import copy
+
+from pypugjs.ext.html import Compiler as HTMLCompiler
+from pypugjs.ext.jinja import Compiler as JinjaCompiler
+from pypugjs.ext.mako import Compiler as MakoCompiler
+from pypugjs.ext.underscore import Compiler as UnderscoreCompiler
+from pypugjs.parser import Parser
+from pypugjs.utils import process, process_many
+
+SRC = '''mixin item(x)
+  li= x
+:cdata
+  raw
+ul
+  each x in [1, 2]
+    +item(x)
+p #{1 + 1}
+'''
+COMPILERS = [JinjaCompiler, UnderscoreCompiler, HTMLCompiler, MakoCompiler]
+
+
+class TestProcessMany:
+    def test_same_as_process(self):
+        expected = [process(SRC, compiler=compiler) for compiler in COMPILERS]
+        assert process_many(SRC, COMPILERS) == expected
+
+    def test_parallel(self):
+        assert process_many(SRC, COMPILERS, parallel=True) == process_many(
+            SRC, COMPILERS
+        )
+
+    def test_tree_is_left_alone(self):
+        block = Parser(SRC).parse()
+        cdata = block.nodes[1]
+        attrs = copy.deepcopy(cdata.attrs)
+        for compiler in COMPILERS:
+            compiler(block, filename='t.pug').compile()
+        assert cdata.attrs == attrs
+
+    def test_options_stay_with_the_compiler(self):
+        inline_tags = list(JinjaCompiler.inline_tags)
+        JinjaCompiler(Parser('p').parse(), inline_tags=['custom'])
+        assert JinjaCompiler.inline_tags == inline_tags
@@ -0,0 +1,188 @@
+"""Test rendering templates compiled to python render functions."""
+
+import gettext
+import io
+import os
+
+import pytest
+
+from pypugjs.exceptions import CurrentlyNotSupported
+from pypugjs.ext.python import Template
+
+
+class Catalog(gettext.NullTranslations):
+    def __init__(self, messages):
+        gettext.NullTranslations.__init__(self)
+        self.messages = messages
+
+    def gettext(self, message):
+        return self.messages.get(message, message)
+
+
+def _render(src, **ctx):
+    return Template(src, pretty=False).render(ctx)
+
+
+class TestPythonTemplate:
+    def test_escapes_context_values(self):
+        assert _render('p= x\np #{x} !{x}', x='<b>') == (
+            '<p>&lt;b&gt;</p><p>&lt;b&gt; <b></p>'
+        )
+
+    def test_missing_names_are_none(self):
+        assert _render('p= x\nif y\n  p y') == '<p>None</p>'
+
+    def test_context_shadows_builtins(self):
+        assert _render('p= len(x)\np= max', x=[1, 2], max=3) == '<p>2</p><p>3</p>'
+
+    def test_each(self):
+        src = 'ul\n  each x, i in items\n    li(class=x)= i'
+        result = _render(src, items=['a', 'b'])
+        assert result == '<ul><li class="a">0</li><li class="b">1</li></ul>'
+
+    def test_conditionals(self):
+        src = 'unless a\n  p not a\nelse if b\n  p b\nelse\n  p else'
+        assert _render(src, a=False) == '<p>not a</p>'
+        assert _render(src, a=True, b=True) == '<p>b</p>'
+        assert _render(src, a=True) == '<p>else</p>'
+
+    def test_code(self):
+        src = '- total = 0\n- for x in items\n  - total += x\np= total'
+        assert _render(src, items=[1, 2, 3]) == '<p>6</p>'
+
+    def test_empty_blocks(self):
+        assert _render('if x\n  //- nothing\np') == '<p></p>'
+
+    def test_mixins(self):
+        src = 'mixin item(x, y="!")\n  li #{x}#{y}\nul\n  +item(1)\n  +item(2, "?")\n  +item()'
+        assert _render(src) == '<ul><li>1!</li><li>2?</li><li>None!</li></ul>'
+
+    def test_mixins_assigning_names_they_read(self):
+        # like with the html compiler the names stay local to each call
+        src = '- n = 1\nmixin inc(step)\n  - n = n + step\n  p= n\n+inc(2)\n+inc(3)\np= n'
+        assert _render(src) == '<p>3</p><p>4</p><p>1</p>'
+        assert _render(src.replace('- n = 1\n', ''), n=10) == '<p>12</p><p>13</p><p>10</p>'
+
+    def test_nested_mixins_assigning_names_they_read(self):
+        src = (
+            '- n = 1\nmixin outer()\n  - n = n + 5\n  mixin inner()\n'
+            '    - n = n + 1\n    p= n\n  +inner()\n  p= n\n+outer()\np= n'
+        )
+        assert _render(src) == '<p>7</p><p>6</p><p>1</p>'
+
+    def test_mixin_call_blocks_are_not_supported(self):
+        with pytest.raises(CurrentlyNotSupported):
+            _render('mixin m()\n  div\n+m()\n  p inner')
+
+    def test_literal_percent_signs(self):
+        assert _render('p 100% #{x}%', x=5) == '<p>100% 5%</p>'
+
+    def test_render_keywords(self):
+        template = Template('p= x', pretty=False)
+        assert template.render({'x': 1}, x=2) == '<p>2</p>'
+        assert template.render(x=3) == '<p>3</p>'
+
+    def test_errors_are_raised(self):
+        with pytest.raises(AttributeError):
+            _render('p= x.name')
+
+
+class TestCachedModules:
+    def test_compiles_once(self, tmp_path, monkeypatch):
+        first = Template('p= x', cache_dir=str(tmp_path), pretty=False)
+        assert first.render(x=1) == '<p>1</p>'
+        assert len(list(tmp_path.glob('pypugjs_*.py'))) == 1
+
+        monkeypatch.setattr('pypugjs.ext.python.process', None)
+        assert Template('p= x', cache_dir=str(tmp_path), pretty=False).render(x=2) == (
+            '<p>2</p>'
+        )
+
+    def test_key_includes_options(self, tmp_path):
+        Template('p= x', cache_dir=str(tmp_path), pretty=False)
+        Template('p= x', cache_dir=str(tmp_path))
+        assert len(list(tmp_path.glob('pypugjs_*.py'))) == 2
+
+    def test_changed_includes_are_compiled_again(self, tmp_path):
+        included = tmp_path / 'part.pug'
+        included.write_text('p one')
+        options = dict(cache_dir=str(tmp_path / 'cache'), basedir=str(tmp_path))
+        assert Template('include part', **options).render() == '<p>one</p>'
+
+        included.write_text('p two')
+        os.utime(str(included), ns=(0, 0))
+        assert Template('include part', **options).render() == '<p>two</p>'
+
+    def test_key_ignores_object_addresses(self, tmp_path):
+        class Options(object):
+            pass
+
+        for _ in range(2):
+            Template('p= x', cache_dir=str(tmp_path), cache_key='k', unused=Options())
+        assert len(list(tmp_path.glob('pypugjs_*.py'))) == 1
+
+    def test_objects_require_a_key(self, tmp_path):
+        with pytest.raises(ValueError):
+            Template('p= _ Hello', cache_dir=str(tmp_path), translations=Catalog({}))
+        assert not list(tmp_path.glob('pypugjs_*'))
+
+    def test_key_tells_objects_apart(self, tmp_path):
+        for locale, hello in (('de', 'Hallo'), ('fr', 'Bonjour')):
+            template = Template(
+                'p= _ Hello',
+                cache_dir=str(tmp_path),
+                cache_key=locale,
+                translations=Catalog({'Hello': hello}),
+                pretty=False,
+            )
+            assert template.render() == '<p>%s</p>' % hello
+
+    def test_key_includes_working_directory(self, tmp_path, monkeypatch):
+        for name in ('one', 'two'):
+            (tmp_path / name).mkdir()
+            (tmp_path / name / 'part.pug').write_text('p %s' % name)
+        for name in ('one', 'two'):
+            monkeypatch.chdir(tmp_path / name)
+            template = Template('include part', cache_dir=str(tmp_path / 'cache'))
+            assert template.render() == '<p>%s</p>' % name
+
+
+class TestRenderIter:
+    src = 'mixin cell(x)\n  td= x\ntable\n  each row in rows\n    tr\n      +cell(row)\np end'
+
+    def test_same_as_render(self):
+        template = Template(self.src)
+        rows = list(range(50))
+        chunks = list(template.render_iter(rows=rows, chunk_size=64))
+        assert len(chunks) > 1
+        assert ''.join(chunks) == template.render(rows=rows)
+
+    def test_chunk_size(self):
+        chunks = list(Template(self.src).render_iter(rows=range(50), chunk_size=64))
+        assert all(len(chunk) >= 64 for chunk in chunks[:-1])
+
+    def test_empty(self):
+        assert list(Template('if x\n  p').render_iter()) == []
+
+
+class TestRenderTo:
+    src = 'mixin item(x)\n  li(title=x)= x\np \u00e9 100% #{x} !{y}\nul\n  +item(x)'
+
+    def _render_to(self, template, encoding, **ctx):
+        sink = io.BytesIO()
+        template.render_to(sink, ctx, encoding=encoding)
+        return sink.getvalue()
+
+    def test_same_as_render(self):
+        template = Template(self.src)
+        result = self._render_to(template, 'utf-8', x='<\u20ac>', y=1)
+        assert result == template.render(x='<\u20ac>', y=1).encode('utf-8')
+
+    def test_character_references(self):
+        result = self._render_to(Template('p \u00e9 #{x}', pretty=False), 'ascii', x='\u20ac')
+        assert result == b'<p>&#233; &#8364;</p>'
+
+    def test_compiled_once_per_encoding(self):
+        template = Template('p= x', encoding='latin-1')
+        assert self._render_to(template, 'latin-1', x=1) == b'<p>1</p>'
+        assert template.encoded == {'latin-1': template}
@@ -0,0 +1,77 @@
+"""Test rendering with awaitable context values and asynchronous loaders.
+
+The python backend renders in a coroutine of its own, the html compiler
+evaluates in a thread and waits for the event loop. Both await what the
+template renders, loop over asynchronous iterables and read includes
+through a coroutine.
+"""
+
+import asyncio
+
+import pytest
+
+from pypugjs.ext.html import render_async
+from pypugjs.ext.python import Template
+
+SRC = 'ul\n  each x, i in items\n    li= x + str(i)\nif flag\n  p= title\np #{title}'
+EXPECTED = '<ul><li>a0</li><li>b1</li></ul><p>&lt;b&gt;</p><p>&lt;b&gt;</p>'
+SOURCES = {'page.pug': 'include part\np= x', 'part.pug': 'b part'}
+
+
+async def _value(value):
+    await asyncio.sleep(0)
+    return value
+
+
+async def _items():
+    for item in 'ab':
+        yield await _value(item)
+
+
+async def _load(path):
+    return await _value(SOURCES[path])
+
+
+def _context():
+    return dict(items=_items(), flag=_value(True), title=_value('<b>'))
+
+
+async def _render_python(src, context):
+    return await Template(src, enable_async=True, pretty=False).render_async(context)
+
+
+async def _render_html(src, context):
+    return await render_async(src, context, pretty=False)
+
+
+@pytest.mark.parametrize('render', [_render_python, _render_html])
+class TestRenderAsync:
+    def test_awaits_values(self, render):
+        assert asyncio.run(render(SRC, _context())) == EXPECTED
+
+    def test_plain_values(self, render):
+        context = dict(items='ab', flag=True, title='<b>')
+        assert asyncio.run(render(SRC, context)) == EXPECTED
+
+    def test_concurrent(self, render):
+        async def main():
+            return await asyncio.gather(*(render(SRC, _context()) for _ in range(20)))
+
+        assert asyncio.run(main()) == [EXPECTED] * 20
+
+
+class TestAsyncLoader:
+    def test_python(self):
+        async def main():
+            template = await Template.load_async('page.pug', _load, pretty=False)
+            return await template.render_async(x=_value(1))
+
+        assert asyncio.run(main()) == '<b>part</b><p>1</p>'
+
+    def test_html(self):
+        render = render_async('include part\np= x', {'x': 1}, _load, pretty=False)
+        assert asyncio.run(render) == '<b>part</b><p>1</p>'
+
+    def test_requires_enable_async(self):
+        with pytest.raises(ValueError):
+            asyncio.run(Template('p').render_async())
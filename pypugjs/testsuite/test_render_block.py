@@ -0,0 +1,108 @@
+"""Test inheritance and rendering single blocks with the python backend and
+the html compiler.
+
+A block renders with the code and mixins it depends on, inheritance
+resolved, but without any of the markup around it.
+"""
+
+import pytest
+
+from pypugjs.ext.html import Compiler, render_block
+from pypugjs.ext.python import Template
+from pypugjs.parser import Parser
+
+LAYOUT = '''- site = 'Site'
+html
+  head
+    title= site + title
+  body
+    nav
+      each x in menu
+        a= x
+    block content
+      p default
+    footer
+      block footer
+        p foot
+'''
+PAGE = '''extends layout
+- title = ' page'
+mixin item(x)
+  li= x
+block content
+  h1= title
+  ul
+    each x in items
+      +item(x)
+block append footer
+  p page
+'''
+
+BASE = 'html\n  block content\n    p base\n  block aside\n    p base aside'
+MIDDLE = 'extends base\nblock aside\n  p middle aside'
+# defines a block aside of its own, the middle template's doesn't replace it
+DERIVED = 'extends middle\nblock content\n  div\n    block aside\n      p derived aside'
+
+
+@pytest.fixture
+def basedir(tmp_path):
+    (tmp_path / 'layout.pug').write_text(LAYOUT)
+    (tmp_path / 'base.pug').write_text(BASE)
+    (tmp_path / 'middle.pug').write_text(MIDDLE)
+    return str(tmp_path)
+
+
+def _python(name, basedir, src=PAGE, **ctx):
+    template = Template(src, pretty=False, basedir=basedir)
+    if name is None:
+        return template.render(ctx)
+    return template.render_block(name, ctx)
+
+
+def _html(name, basedir, src=PAGE, **ctx):
+    if name is None:
+        block = Parser(src).parse()
+        return Compiler(block, pretty=False, basedir=basedir, context=ctx).compile()
+    return render_block(src, name, ctx, pretty=False, basedir=basedir)
+
+
+@pytest.mark.parametrize('render', [_python, _html])
+class TestRenderBlock:
+    def test_inheritance(self, render, basedir):
+        result = render(None, basedir, menu=['a'], items=[1])
+        assert result == (
+            '<html><head><title>Site page</title></head><body><nav><a>a</a></nav>'
+            '<h1> page</h1><ul><li>1</li></ul>'
+            '<footer><p>foot</p><p>page</p></footer></body></html>'
+        )
+
+    def test_block(self, render, basedir):
+        result = render('content', basedir, items=[1, 2])
+        assert result == '<h1> page</h1><ul><li>1</li><li>2</li></ul>'
+
+    def test_appended_block(self, render, basedir):
+        assert render('footer', basedir) == '<p>foot</p><p>page</p>'
+
+    def test_skips_the_rest(self, render, basedir):
+        # the menu would fail to iterate
+        assert render('footer', basedir, menu=1) == '<p>foot</p><p>page</p>'
+
+    def test_missing_block(self, render, basedir):
+        assert render('sidebar', basedir) == ''
+
+    def test_nested_blocks_of_three_levels(self, render, basedir):
+        result = render(None, basedir, src=DERIVED)
+        assert result == (
+            '<html><div><p>derived aside</p></div><p>middle aside</p></html>'
+        )
+
+
+class TestParsedTrees:
+    def test_stay_unchanged(self, basedir):
+        block = Parser(DERIVED).parse()
+        compiler = Compiler(pretty=False, basedir=basedir)
+        first = compiler.compile(block)
+        assert compiler.compile(block) == first
+        aside = block.nodes[1].nodes[0].block.nodes[0]
+        assert aside.name == 'aside'
+        assert aside.nodes[0].text.nodes == [' derived aside']
@@ -39,6 +39,32 @@ class TestIteration(unittest.TestCase):
         assert list(runtime.iteration(test_list, 1)) == test_list
 
 
+class TestAttrsRenderer(unittest.TestCase):
+    values = [True, False, None, 0, "", "class", "a<b", ["a", ["b"]], {"on": 1, "off": 0}]
+
+    def test_it_renders_like_attrs(self):
+        for terse in (False, True):
+            for name in ("href", "class"):
+                render = runtime.attrs_renderer((name, "title"), terse)
+                for value in self.values:
+                    assert render(value, "t") == runtime.attrs(
+                        [(name, value), ("title", "t")], terse
+                    )
+
+    def test_it_skips_undefined_values(self):
+        class Undefined(object):
+            pass
+
+        render = runtime.attrs_renderer(("href",), undefined=Undefined)
+        assert render(Undefined()) == ""
+        assert render("/") == ' href="/"'
+
+    def test_it_caches_renderers_per_signature(self):
+        render = runtime.attrs_renderer(("href", "class"))
+        assert runtime.attrs_renderer(("href", "class")) is render
+        assert runtime.attrs_renderer(("href", "class"), True) is not render
+
+
 class TestOpen(unittest.TestCase):
     def test_encoding_taken_directly(self):
         """If an encoding is given, we don't try to make a guess."""
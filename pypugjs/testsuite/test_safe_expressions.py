@@ -0,0 +1,154 @@
+"""Test that escaping is only skipped for expressions proven safe.
+
+Numbers, booleans and loop counters of the engine render without any
+character html escapes, so the compilers leave out the escape filter for
+them. Everything else, and everything that merely looks like it, has to
+stay escaped.
+"""
+
+import pytest
+from jinja2 import DictLoader, Environment
+from mako.template import Template as MakoTemplate
+
+import pypugjs.ext.mako
+from pypugjs.ext.django.compiler import Compiler as DjangoCompiler
+from pypugjs.ext.html import process_pugjs
+from pypugjs.ext.jinja import Compiler, PyPugJSExtension
+from pypugjs.ext.python import Template as PythonTemplate
+from pypugjs.ext.tornado import Template as TornadoTemplate
+from pypugjs.parser import Parser
+
+XSS = '<script>alert(1)</script>'
+
+
+def _compile(src: str, compiler=Compiler) -> str:
+    return compiler(Parser(src).parse()).compile()
+
+
+def _render_jinja(src, **ctx):
+    env = Environment(
+        extensions=[PyPugJSExtension], loader=DictLoader({'t.pug': src})
+    )
+    return env.get_template('t.pug').render(**ctx)
+
+
+def _render_mako(src, **ctx):
+    return MakoTemplate(src, preprocessor=pypugjs.ext.mako.preprocessor).render(
+        **ctx
+    )
+
+
+def _render_tornado(src, **ctx):
+    return TornadoTemplate(src, name='t.pug').generate(**ctx).decode('utf-8')
+
+
+def _render_html(src, **ctx):
+    return process_pugjs(src, context=ctx)
+
+
+def _render_python(src, **ctx):
+    return PythonTemplate(src).render(ctx)
+
+
+class TestElided:
+    @pytest.mark.parametrize(
+        'src',
+        [
+            'p= 42',
+            'p= 1 + 2 * 3 - 4 / 5',
+            'p= -7 // 2 % 3',
+            'p #{3}',
+            "p= 'plain text'",
+            'p= not x',
+            'p= 1 < 2',
+            '- var count = 3\np= count',
+            'each item in items\n  p= loop.index',
+            'each item in items\n  p #{loop.index0 + 1}',
+        ],
+    )
+    def test_no_escape(self, src):
+        assert '|escape' not in _compile(src)
+
+
+class TestKept:
+    @pytest.mark.parametrize(
+        'src',
+        [
+            'p= x',
+            'p #{x}',
+            'p= x * 1',
+            'p= x if 1 else 2',
+            'p= 1 + x',
+            "p= '<b>'",
+            '- var title = "<b>" if x else ""\np= title',
+            'p= loop.index',
+            'mixin m()\n  p= loop.index\neach item in items\n  +m()',
+            'each loop in items\n  p= loop.index',
+            'each item in items\n  - loop = item\n  p= loop.index',
+        ],
+    )
+    def test_escape(self, src):
+        assert '|escape' in _compile(src)
+
+    def test_django_keeps_escaping(self):
+        result = _compile('each item in items\n  p= forloop.counter', DjangoCompiler)
+        assert '|force_escape' in result
+
+    def test_django_variables_named_like_literals(self):
+        # false is a variable to django, not a boolean
+        result = _compile('- var flag = false\nif flag\n  p= 1', DjangoCompiler)
+        assert '{% if flag %}' in result.replace('  ', ' ')
+
+
+class TestNoXSS:
+    """Render hostile values through every engine that elides escaping."""
+
+    cases = [
+        ('p= x', {'x': XSS}),
+        ('p #{x}', {'x': XSS}),
+        ('p= x * 1', {'x': XSS}),
+        ('p= x if 1 else 2', {'x': XSS}),
+        ('p= loop.index', {'loop': {'index': XSS}}),
+        ('p #{loop.index}', {'loop': {'index': XSS}}),
+        ('each item in items\n  p= item', {'items': [XSS]}),
+        ('- var title = "<script>"\np= title', {}),
+    ]
+
+    @pytest.mark.parametrize('render', [_render_jinja, _render_mako, _render_tornado])
+    @pytest.mark.parametrize('src, ctx', cases)
+    def test_hostile_values_are_escaped(self, render, src, ctx):
+        if 'loop' in ctx:
+            if render is _render_mako:
+                pytest.skip('loop is reserved in mako')
+            if render is _render_tornado:
+                ctx = {'loop': type('Loop', (), ctx['loop'])}
+        assert '<script>' not in render(src, **ctx)
+
+    @pytest.mark.parametrize('render', [_render_jinja, _render_mako, _render_tornado])
+    def test_numbers_render(self, render):
+        src = 'p= 6 * 7\np #{1 + 1}\np= not x'
+        result = render(src, x=1).strip()
+        assert result == '<p>42</p>\n<p>2</p>\n<p>False</p>'
+
+
+class TestLiteralNames:
+    """Only the literals of the engine are folded, other names stay names."""
+
+    src = 'if true\n  p yes\nelse\n  p no'
+
+    def test_jinja_literals(self):
+        assert '{% if' not in _compile(self.src)
+        assert '{% if' not in _compile('if none\n  p yes')
+        assert _render_jinja(self.src).strip() == '<p>yes</p>'
+
+    def test_jinja_null_is_a_name(self):
+        assert 'null' in _compile('if null\n  p yes')
+
+    @pytest.mark.parametrize('render', [_render_mako, _render_html, _render_python])
+    def test_lowercase_names_in_python(self, render):
+        assert render(self.src).strip() == '<p>no</p>'
+        assert render(self.src, true=1).strip() == '<p>yes</p>'
+
+    def test_lowercase_names_in_tornado(self):
+        with pytest.raises(NameError):
+            _render_tornado(self.src)
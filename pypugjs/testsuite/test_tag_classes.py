@@ -0,0 +1,24 @@
+"""Test the tag classifications the compilers share per configuration."""
+
+from pypugjs.ext.jinja import Compiler
+from pypugjs.utils import process
+
+
+def _compile(src: str) -> str:
+    return process(src, compiler=Compiler, pretty=False)
+
+
+class TestTagClasses:
+    def test_self_closing_depends_on_doctype(self):
+        assert _compile('doctype html\nbr') == '<!DOCTYPE html><br>'
+        assert _compile('doctype xml\nbr') == (
+            '<?xml version="1.0" encoding="utf-8" ?><br></br>'
+        )
+        assert _compile('br') == '<br/>'
+
+    def test_tables_are_shared(self):
+        first = Compiler(None)
+        second = Compiler(None)
+        assert first.classify_tag('img') is second.classify_tag('img')
+        assert first.classify_tag('img')[:3] == (True, True, False)
+        assert first.classify_tag('pre')[3:] == ('<pre', '</pre>')
@@ -0,0 +1,61 @@
+"""Test translating static ``_ text`` strings at compile time.
+
+With a gettext catalog passed as the ``translations`` option the compiler
+puts the translated text right into the output, without it the runtime
+``_()`` call stays in place.
+"""
+
+import gettext
+
+from pypugjs.ext.jinja import Compiler
+from pypugjs.utils import process, process_locales
+
+
+class Catalog(gettext.NullTranslations):
+    def __init__(self, messages):
+        gettext.NullTranslations.__init__(self)
+        self.messages = messages
+
+    def gettext(self, message):
+        return self.messages.get(message, message)
+
+    ugettext = gettext
+
+
+GERMAN = Catalog({'Hello': 'Hallo', 'Cats & dogs': 'Katzen & Hunde'})
+
+
+def _compile(src: str, **options) -> str:
+    return process(src, compiler=Compiler, **options)
+
+
+class TestTranslations:
+    def test_runtime_call_without_catalog(self):
+        assert _compile('p= _ Hello') == '<p>{{(_("Hello"))|escape}}</p>'
+
+    def test_code(self):
+        assert _compile('p= _ Hello', translations=GERMAN) == '<p>Hallo</p>'
+
+    def test_interpolation(self):
+        result = _compile('p #{_ Hello} world', translations=GERMAN)
+        assert result == '<p>Hallo world</p>'
+
+    def test_escaping(self):
+        result = _compile('p= _ Cats & dogs\np!= _ Cats & dogs', translations=GERMAN)
+        assert result == '<p>Katzen &amp; Hunde</p>\n<p>Katzen & Hunde</p>'
+
+    def test_untranslated_message(self):
+        assert _compile('p= _ Bye', translations=GERMAN) == '<p>Bye</p>'
+
+    def test_template_syntax_stays_runtime(self):
+        catalog = Catalog({'Hello': 'Hallo {{ name }}'})
+        result = _compile('p= _ Hello', translations=catalog)
+        assert result == '<p>{{(_("Hello"))|escape}}</p>'
+
+    def test_process_locales(self):
+        result = process_locales(
+            'p= _ Hello',
+            {'de': GERMAN, 'en': gettext.NullTranslations()},
+            compiler=Compiler,
+        )
+        assert result == {'de': '<p>Hallo</p>', 'en': '<p>Hello</p>'}
@@ -228,7 +228,96 @@ class odict(dict):
 
 
 def process(src, filename=None, parser=Parser, compiler=HTMLCompiler, **kwargs):
-    _parser = parser(src, filename=filename)
-    block = _parser.parse()
-    _compiler = compiler(block, **kwargs)
-    return _compiler.compile().strip()
+    """Compile src with a compiler class, or reuse a configured compiler.
+
+    Options go to the compiler class, a configured compiler has them from its
+    constructor already and raises a TypeError if given more.
+    """
+    block = parser(src, filename=filename).parse()
+    return _compiler(compiler, block, kwargs).compile(block).strip()
+
+
+def process_iter(src, filename=None, parser=Parser, compiler=HTMLCompiler, **kwargs):
+    """Compile src like `process`, yielding the source in chunks."""
+    block = parser(src, filename=filename).parse()
+    return strip_fragments(_compiler(compiler, block, kwargs).compile_iter(block))
+
+
+def _compiler(compiler, block, options):
+    if isinstance(compiler, type):
+        return compiler(block, **options)
+    if options:
+        raise TypeError(
+            'options of a compiler instance belong to its constructor, got %s'
+            % ', '.join(sorted(options))
+        )
+    return compiler
+
+
+def strip_fragments(fragments):
+    """Yield fragments without the whitespace around all of them.
+
+    Whitespace-only fragments are held back until more text follows, the
+    last fragment with text one step longer to strip its end.
+    """
+    fragments = iter(fragments)
+    for last in fragments:
+        last = last.lstrip()
+        if last:
+            break
+    else:
+        return
+    held = []
+    for fragment in fragments:
+        if not fragment or fragment.isspace():
+            held.append(fragment)
+            continue
+        yield last
+        for space in held:
+            yield space
+        del held[:]
+        last = fragment
+    yield last.rstrip()
+
+
+def process_locales(
+    src, translations, filename=None, parser=Parser, compiler=HTMLCompiler, **kwargs
+):
+    """Compile src once per locale with its static strings translated.
+
+    `translations` maps each locale to a gettext translations object, the
+    result maps it to the compiled source.
+    """
+    return dict(
+        (
+            locale,
+            process(
+                src,
+                filename=filename,
+                parser=parser,
+                compiler=compiler,
+                translations=catalog,
+                **kwargs
+            ),
+        )
+        for locale, catalog in translations.items()
+    )
+
+
+def process_many(src, compilers, filename=None, parser=Parser, parallel=False, **kwargs):
+    """Compile src with each of compilers from a single parse.
+
+    Compilers leave the tree as it is, so they can share it, in threads of
+    their own with `parallel`. Returns the results in the order of compilers.
+    """
+    block = parser(src, filename=filename).parse()
+
+    def compile(compiler):
+        return compiler(block, **kwargs).compile().strip()
+
+    if not parallel:
+        return [compile(compiler) for compiler in compilers]
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=len(compilers) or 1) as executor:
+        return list(executor.map(compile, compilers))